@@ -6,24 +6,51 @@ Uses HTTP-only secure cookies for session storage.
 """
 
 from fastapi import APIRouter, Request, HTTPException, Response, Depends
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse
 from pydantic import BaseModel
-import httpx
-import os
+from starlette.background import BackgroundTask
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
 import logging
+import orjson
 
 from app.auth_utils import verify_password, validate_password_strength, hash_password
+from app.admin.supabase import get_supabase_client, parse_json, ACCEPT_SINGLE_OBJECT, PREFER_RETURN_MINIMAL
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Session configuration
 SESSION_COOKIE_NAME = "admin_session"
 SESSION_MAX_AGE = 8 * 60 * 60  # 8 hours in seconds
 
+# Super admins have all permissions
+SUPER_ADMIN_PERMISSIONS = (
+    "view_timesheets",
+    "view_voice_notes",
+    "manage_users",
+    "manage_sites",
+    "view_reports",
+    "manage_settings"
+)
+
+# Verified against when the user doesn't exist, so unknown usernames cost the
+# same bcrypt work as wrong passwords and can't be told apart by timing.
+# Hashed with the default cost so it matches real password hashes.
+_DUMMY_PASSWORD_HASH = hash_password("not-a-real-admin-password")
+
+# Fixed bodies for the hottest trivial responses (/me is polled by the UI),
+# encoded once instead of per request
+_NOT_AUTHENTICATED_BODY = orjson.dumps({"success": False, "message": "Not authenticated"})
+_LOGGED_OUT_BODY = orjson.dumps({"success": True, "message": "Logged out successfully"})
+
+
+def _iso_now() -> str:
+    """Current UTC time as ISO-8601 with second precision (e.g. 2025-01-17T09:30:00Z)"""
+    return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
 
 class LoginRequest(BaseModel):
     username: str
@@ -41,86 +68,58 @@ class PasswordChangeRequest(BaseModel):
     new_password: str
 
 
-async def get_admin_user_by_username(username: str) -> Optional[dict]:
-    """Get admin user from database by username or email (case-insensitive)"""
-    async with httpx.AsyncClient() as client:
-        # Try to find by username first
-        response = await client.get(
-            f"{os.getenv('SUPABASE_URL')}/rest/v1/admin_users",
-            headers={
-                "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-            },
-            params={
-                "username": f"ilike.{username}",  # Case-insensitive match
-                "is_active": "eq.true",
-                "select": "id,username,email,password_hash,role,tenant_id,tenants(id,name)"
-            }
-        )
-
-        if response.status_code == 200:
-            users = response.json()
-            if users:
-                return users[0]
-
-        # If not found by username, try email
-        response = await client.get(
-            f"{os.getenv('SUPABASE_URL')}/rest/v1/admin_users",
-            headers={
-                "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-            },
-            params={
-                "email": f"ilike.{username}",  # Case-insensitive match
-                "is_active": "eq.true",
-                "select": "id,username,email,password_hash,role,tenant_id,tenants(id,name)"
-            }
-        )
+async def get_admin_password_hash(user_id: str) -> Optional[dict]:
+    """Get the id and password hash of an active admin user by id"""
+    client = get_supabase_client()
+    response = await client.get(
+        "/rest/v1/admin_users",
+        headers=ACCEPT_SINGLE_OBJECT,
+        params={
+            "id": f"eq.{user_id}",
+            "is_active": "eq.true",
+            "select": "id,password_hash"
+        }
+    )
 
-        if response.status_code == 200:
-            users = response.json()
-            if users:
-                return users[0]
+    if response.status_code == 200:
+        return parse_json(response)
 
-        return None
+    return None
 
 
 async def update_last_login(user_id: str):
     """Update last_login_at timestamp for user"""
-    async with httpx.AsyncClient() as client:
-        await client.patch(
-            f"{os.getenv('SUPABASE_URL')}/rest/v1/admin_users",
-            headers={
-                "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}",
-                "Content-Type": "application/json",
-                "Prefer": "return=minimal"
-            },
-            params={"id": f"eq.{user_id}"},
-            json={"last_login_at": datetime.utcnow().isoformat()}
-        )
+    client = get_supabase_client()
+    await client.patch(
+        "/rest/v1/admin_users",
+        headers=PREFER_RETURN_MINIMAL,
+        params={"id": f"eq.{user_id}"},
+        json={"last_login_at": _iso_now()}
+    )
 
 
-async def get_user_permissions(user_id: str) -> list:
-    """Get permissions for a tenant_admin user"""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{os.getenv('SUPABASE_URL')}/rest/v1/admin_user_permissions",
-            headers={
-                "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-            },
-            params={
-                "admin_user_id": f"eq.{user_id}",
-                "select": "permission_type"
-            }
-        )
+async def get_admin_login_context(identifier: str) -> Optional[dict]:
+    """
+    Get everything login needs in one round-trip
 
-        if response.status_code == 200:
-            perms = response.json()
-            return [p["permission_type"] for p in perms]
+    Calls the get_admin_login_context RPC (migrations/005), which returns the
+    active admin user matched by username or email (case-insensitive), their
+    tenant and their permissions.
 
-        return []
+    Returns:
+        User dict with 'tenants' and 'permissions', or None if not found
+    """
+    client = get_supabase_client()
+    response = await client.post(
+        "/rest/v1/rpc/get_admin_login_context",
+        json={"p_identifier": identifier}
+    )
+
+    if response.status_code == 200:
+        return parse_json(response) or None
+
+    logger.error("Login context lookup failed: %s - %s", response.status_code, response.text)
+    return None
 
 
 @router.post("/admin/auth/login")
@@ -133,26 +132,24 @@ async def login(request: Request, login_data: LoginRequest):
         Sets HTTP-only secure cookie for session management
     """
     try:
-        # Debug logging
-        logger.info(f"Login attempt - username: {login_data.username}, password length: {len(login_data.password)}")
-
-        # Get user from database
-        user = await get_admin_user_by_username(login_data.username)
-
-        if not user:
-            logger.warning(f"Login attempt for non-existent user: {login_data.username}")
-            return JSONResponse(
-                status_code=401,
-                content={"success": False, "message": "Invalid username or password"}
-            )
-
-        # Verify password
-        password_valid = verify_password(login_data.password, user["password_hash"])
-        logger.info(f"Password verification result: {password_valid}")
-
-        if not password_valid:
-            logger.warning(f"Failed login attempt for user: {login_data.username}")
-            return JSONResponse(
+        logger.info("Login attempt - username: %s", login_data.username)
+
+        # Get user, tenant and permissions from database (single RPC)
+        user = await get_admin_login_context(login_data.username)
+
+        # Verify password (bcrypt is CPU-bound, keep it off the event loop).
+        # Unknown users are checked against a dummy hash so both failure
+        # paths take the same time.
+        password_hash = user["password_hash"] if user else _DUMMY_PASSWORD_HASH
+        password_valid = await asyncio.to_thread(verify_password, login_data.password, password_hash)
+        logger.debug("Password verification result: %s", password_valid)
+
+        if not user or not password_valid:
+            if not user:
+                logger.warning("Login attempt for non-existent user: %s", login_data.username)
+            else:
+                logger.warning("Failed login attempt for user: %s", login_data.username)
+            return ORJSONResponse(
                 status_code=401,
                 content={"success": False, "message": "Invalid username or password"}
             )
@@ -160,20 +157,9 @@ async def login(request: Request, login_data: LoginRequest):
         # Get permissions for tenant_admin users
         permissions = []
         if user["role"] == "tenant_admin":
-            permissions = await get_user_permissions(user["id"])
+            permissions = user.get("permissions") or []
         elif user["role"] == "super_admin":
-            # Super admins have all permissions
-            permissions = [
-                "view_timesheets",
-                "view_voice_notes",
-                "manage_users",
-                "manage_sites",
-                "view_reports",
-                "manage_settings"
-            ]
-
-        # Update last login
-        await update_last_login(user["id"])
+            permissions = list(SUPER_ADMIN_PERMISSIONS)
 
         # Prepare session data
         session_data = {
@@ -184,16 +170,17 @@ async def login(request: Request, login_data: LoginRequest):
             "tenant_id": user.get("tenant_id"),
             "tenant_name": user.get("tenants", {}).get("name") if user.get("tenants") else None,
             "permissions": permissions,
-            "login_time": datetime.utcnow().isoformat()
+            "login_time": _iso_now()
         }
 
         # Store session in request.session (handled by SessionMiddleware)
         request.session["user"] = session_data
 
-        logger.info(f"Successful login: {login_data.username} (role: {user['role']})")
+        logger.info("Successful login: %s (role: %s)", login_data.username, user["role"])
 
-        # Return user info (without password hash)
-        return JSONResponse(
+        # Return user info (without password hash). The last-login stamp is
+        # written after the response is sent, off the login critical path.
+        return ORJSONResponse(
             status_code=200,
             content={
                 "success": True,
@@ -206,12 +193,13 @@ async def login(request: Request, login_data: LoginRequest):
                     "tenant_name": session_data["tenant_name"],
                     "permissions": permissions
                 }
-            }
+            },
+            background=BackgroundTask(update_last_login, user["id"])
         )
 
     except Exception as e:
-        logger.error(f"Login error: {str(e)}")
-        return JSONResponse(
+        logger.error("Login error: %s", e)
+        return ORJSONResponse(
             status_code=500,
             content={"success": False, "message": "An error occurred during login"}
         )
@@ -229,14 +217,11 @@ async def logout(request: Request):
         # Clear session
         request.session.clear()
 
-        return JSONResponse(
-            status_code=200,
-            content={"success": True, "message": "Logged out successfully"}
-        )
+        return Response(content=_LOGGED_OUT_BODY, media_type="application/json")
 
     except Exception as e:
-        logger.error(f"Logout error: {str(e)}")
-        return JSONResponse(
+        logger.error("Logout error: %s", e)
+        return ORJSONResponse(
             status_code=500,
             content={"success": False, "message": "An error occurred during logout"}
         )
@@ -253,12 +238,9 @@ async def get_current_user(request: Request):
     user_session = request.session.get("user")
 
     if not user_session:
-        return JSONResponse(
-            status_code=401,
-            content={"success": False, "message": "Not authenticated"}
-        )
+        return Response(content=_NOT_AUTHENTICATED_BODY, status_code=401, media_type="application/json")
 
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=200,
         content={
             "success": True,
@@ -278,16 +260,13 @@ async def change_password(request: Request, password_data: PasswordChangeRequest
     user_session = request.session.get("user")
 
     if not user_session:
-        return JSONResponse(
-            status_code=401,
-            content={"success": False, "message": "Not authenticated"}
-        )
+        return Response(content=_NOT_AUTHENTICATED_BODY, status_code=401, media_type="application/json")
 
     try:
         # Validate new password strength
         validation = validate_password_strength(password_data.new_password)
         if not validation["valid"]:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=400,
                 content={
                     "success": False,
@@ -296,56 +275,51 @@ async def change_password(request: Request, password_data: PasswordChangeRequest
                 }
             )
 
-        # Get current user from database
-        user = await get_admin_user_by_username(user_session["username"])
+        # Get current password hash from database
+        user = await get_admin_password_hash(user_session["user_id"])
 
         if not user:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=404,
                 content={"success": False, "message": "User not found"}
             )
 
         # Verify current password
-        if not verify_password(password_data.current_password, user["password_hash"]):
-            return JSONResponse(
+        if not await asyncio.to_thread(verify_password, password_data.current_password, user["password_hash"]):
+            return ORJSONResponse(
                 status_code=401,
                 content={"success": False, "message": "Current password is incorrect"}
             )
 
         # Hash new password
-        new_password_hash = hash_password(password_data.new_password)
+        new_password_hash = await asyncio.to_thread(hash_password, password_data.new_password)
 
         # Update password in database
-        async with httpx.AsyncClient() as client:
-            response = await client.patch(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/admin_users",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=minimal"
-                },
-                params={"id": f"eq.{user['id']}"},
-                json={"password_hash": new_password_hash}
-            )
+        client = get_supabase_client()
+        response = await client.patch(
+            "/rest/v1/admin_users",
+            headers=PREFER_RETURN_MINIMAL,
+            params={"id": f"eq.{user['id']}"},
+            json={"password_hash": new_password_hash}
+        )
 
-            if response.status_code not in [200, 204]:
-                logger.error(f"Failed to update password: {response.status_code} - {response.text}")
-                return JSONResponse(
-                    status_code=500,
-                    content={"success": False, "message": "Failed to update password"}
-                )
+        if response.status_code not in [200, 204]:
+            logger.error("Failed to update password: %s - %.500s", response.status_code, response.text)
+            return ORJSONResponse(
+                status_code=500,
+                content={"success": False, "message": "Failed to update password"}
+            )
 
-        logger.info(f"Password changed for user: {user_session['username']}")
+        logger.info("Password changed for user: %s", user_session["username"])
 
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=200,
             content={"success": True, "message": "Password changed successfully"}
         )
 
     except Exception as e:
-        logger.error(f"Change password error: {str(e)}")
-        return JSONResponse(
+        logger.error("Change password error: %s", e)
+        return ORJSONResponse(
             status_code=500,
             content={"success": False, "message": "An error occurred while changing password"}
         )
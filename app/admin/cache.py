@@ -0,0 +1,83 @@
+"""
+Stale-While-Revalidate Cache
+
+In-process cache for values that are loaded from Supabase and polled by
+the admin UI (dashboard stats, ...). A value is served from memory while
+fresh; once it goes stale it is still served immediately, and a single
+background task reloads it for the next caller. Values older than the
+stale limit are dropped and loaded inline.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class StaleWhileRevalidateCache:
+    """TTL cache that refreshes stale entries in the background"""
+
+    def __init__(
+        self,
+        maxsize: int,
+        fresh_ttl: float,
+        stale_ttl: float,
+        keep_stale_on_error: bool = True
+    ):
+        """
+        Args:
+            maxsize: Maximum number of keys kept
+            fresh_ttl: Seconds a value is served without triggering a refresh
+            stale_ttl: Seconds after which a value is dropped entirely
+            keep_stale_on_error: Keep serving the stale value when a background
+                refresh fails. Pass False for credentials, so a failed or
+                rejected refresh drops the entry and the next get() reloads it.
+        """
+        self.fresh_ttl = fresh_ttl
+        self.keep_stale_on_error = keep_stale_on_error
+        self._entries = TTLCache(maxsize=maxsize, ttl=stale_ttl)
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Get a cached value, loading it on a miss
+
+        Args:
+            key: Cache key
+            loader: Zero-argument coroutine function that loads the value
+
+        Returns:
+            Cached (possibly stale) or freshly loaded value
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return await self._load(key, loader)
+
+        value, fresh_until = entry
+        if time.monotonic() >= fresh_until and key not in self._refreshing:
+            self._refreshing[key] = asyncio.create_task(self._refresh(key, loader))
+
+        return value
+
+    def invalidate(self, key: Hashable):
+        """Drop a cached value so the next get() loads it again"""
+        self._entries.pop(key, None)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loader()
+        self._entries[key] = (value, time.monotonic() + self.fresh_ttl)
+        return value
+
+    async def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        try:
+            await self._load(key, loader)
+        except Exception as e:
+            logger.warning("Background cache refresh failed for %s: %s", key, e)
+            if not self.keep_stale_on_error:
+                self.invalidate(key)
+        finally:
+            self._refreshing.pop(key, None)
@@ -0,0 +1,94 @@
+"""
+HTTP Caching Helpers for Admin JSON Endpoints
+
+Admin pages poll a handful of read-mostly endpoints (tenants, dashboard
+stats, ...). These helpers pre-render a payload to JSON bytes once,
+derive a weak ETag from those bytes, and answer conditional requests
+with 304 Not Modified so unchanged data is neither re-encoded nor
+re-sent.
+"""
+
+import hashlib
+from typing import Optional, Tuple
+
+import orjson
+from fastapi import Request, Response
+
+
+def render_json(payload) -> Tuple[bytes, str]:
+    """
+    Encode a payload to JSON and compute its weak ETag
+
+    Args:
+        payload: JSON-serializable response content
+
+    Returns:
+        Tuple of (JSON body bytes, ETag header value)
+    """
+    body = orjson.dumps(payload)
+    etag = 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    return body, etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag (weak comparison)
+
+    Args:
+        if_none_match: Raw If-None-Match header value, may list several tags
+        etag: Current ETag of the resource
+
+    Returns:
+        True if the client's cached copy is still current
+    """
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+
+    return False
+
+
+def cached_json_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    max_age: int,
+    stale_while_revalidate: int = 0
+) -> Response:
+    """
+    Build a private, cacheable JSON response, or a 304 if the client is current
+
+    Args:
+        request: Incoming request (read for If-None-Match)
+        body: Pre-rendered JSON body from render_json()
+        etag: ETag from render_json()
+        max_age: Seconds the browser may reuse the response without revalidating
+            (0 = always revalidate, relying on the ETag). Keep 0 for anything
+            that depends on the session.
+        stale_while_revalidate: Extra seconds a stale copy may be shown while
+            the browser revalidates in the background
+
+    Returns:
+        200 response with the body, or an empty 304 response
+    """
+    cache_control = f"private, max-age={max_age}"
+    if stale_while_revalidate:
+        cache_control += f", stale-while-revalidate={stale_while_revalidate}"
+    # Admin data depends on the session cookie, not just the URL, so a copy
+    # cached for one login must never be reused for another
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Cookie"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,20 +1,75 @@
 # app/admin/routes.py - Admin UI routes
-from fastapi import APIRouter, Request, Depends, HTTPException, Header
+from fastapi import APIRouter, Request, Depends, HTTPException, Header, Path
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
-import httpx
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse, StreamingResponse
+from dataclasses import dataclass
+from datetime import date
+import hashlib
+import hmac
 import os
-from typing import Optional
+import re
+import uuid
+from typing import List, Optional, Set
 import logging
+import orjson
+from cachetools import TTLCache
 from dotenv import load_dotenv
+from jinja2 import FileSystemBytecodeCache
+
+from app.admin.supabase import (
+    get_supabase_client,
+    parse_json,
+    parse_content_range_total,
+    ACCEPT_SINGLE_OBJECT,
+    PREFER_COUNT_EXACT,
+    PREFER_RETURN_MINIMAL,
+    PREFER_RETURN_REPRESENTATION,
+    PREFER_UPSERT_MINIMAL
+)
+from app.admin.http_cache import render_json, cached_json_response
+from app.admin.cache import StaleWhileRevalidateCache
+from app.admin.timesheets import (
+    TimesheetFilters,
+    fetch_timesheet_report,
+    summarize_entries,
+    attach_entries_to_sites,
+    USER_SUMMARY_RPC,
+    SITE_SUMMARY_RPC
+)
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
-templates = Jinja2Templates(directory="app/admin/templates")
+router = APIRouter(default_response_class=ORJSONResponse)
+# Compiled templates are kept in Jinja's in-memory cache and persisted as
+# bytecode (system temp dir) so new workers skip parsing. Template files only
+# change on deploy, so production skips the per-render mtime check.
+templates = Jinja2Templates(
+    directory="app/admin/templates",
+    bytecode_cache=FileSystemBytecodeCache(),
+    auto_reload=os.getenv("ENVIRONMENT") != "production",
+    cache_size=400
+)
+
+# PostgREST column lists shared by the handlers below
+TENANT_COLUMNS = "id,name,created_at,timezone"
+USER_COLUMNS = "id,name,phone_number,email,role,is_active,created_at"
+USER_WITH_SKILLS_COLUMNS = USER_COLUMNS + ",skills"
+USER_WITH_TENANT_AND_SKILLS_COLUMNS = USER_WITH_SKILLS_COLUMNS + ",tenant_name"
+SKILL_COLUMNS = "id,skill_key,name"
+SITE_COLUMNS = "id,name,address,tenant_id"
+
+# Ids in URL paths are interpolated into PostgREST filters, so only accept UUIDs
+UUID_PATTERN = r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+_UUID_RE = re.compile(UUID_PATTERN)
+
+def is_uuid_list(values) -> bool:
+    """True if values is a list of UUID strings (safe to put in an in.(...) filter)"""
+    return isinstance(values, list) and all(
+        isinstance(value, str) and _UUID_RE.fullmatch(value) for value in values
+    )
 
 # ============================================
 # AUTHENTICATION MIDDLEWARE
@@ -22,7 +77,64 @@ templates = Jinja2Templates(directory="app/admin/templates")
 
 # Super admin key from environment
 SUPER_ADMIN_KEY = os.getenv("SUPER_ADMIN_API_KEY", "super-admin-change-me")
-logger.info(f"Super admin key loaded: {SUPER_ADMIN_KEY[:10]}... (length: {len(SUPER_ADMIN_KEY)})")
+_SUPER_ADMIN_KEY_BYTES = SUPER_ADMIN_KEY.encode()
+logger.debug("Super admin key loaded (length=%d)", len(SUPER_ADMIN_KEY))
+
+# Tenant names and API-key -> tenant lookups rarely change, so each worker
+# caches them for a few minutes instead of hitting Supabase on every request.
+# Entries are refreshed in the background once half their lifetime has passed,
+# so steady traffic never waits on Supabase for auth.
+# API keys are cached by hash so raw keys are never kept in memory. A key
+# whose refresh fails (revoked, or Supabase unreachable) is dropped rather
+# than served stale, so the next request re-authenticates it inline.
+_TENANT_NAME_CACHE = StaleWhileRevalidateCache(maxsize=1024, fresh_ttl=150, stale_ttl=300)
+_API_KEY_TENANT_CACHE = StaleWhileRevalidateCache(
+    maxsize=1024, fresh_ttl=150, stale_ttl=300, keep_stale_on_error=False
+)
+
+def _api_key_cache_key(api_key: str) -> str:
+    return hashlib.blake2b(api_key.encode(), digest_size=16).hexdigest()
+
+def parse_tenant_id(value: Optional[str]) -> Optional[str]:
+    """Normalize a tenant id to canonical UUID form, or None if missing/invalid"""
+    try:
+        return str(uuid.UUID(value))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+async def _fetch_tenant_name(tenant_id: str) -> Optional[str]:
+    response = await get_supabase_client().get(
+        "/rest/v1/tenants",
+        headers=ACCEPT_SINGLE_OBJECT,
+        params={"id": f"eq.{tenant_id}", "select": "name"}
+    )
+    if response.status_code == 200:
+        return parse_json(response)["name"]
+    return None
+
+async def get_tenant_name(tenant_id: str) -> Optional[str]:
+    """Get a tenant's name (cached in-process), or None if not found"""
+    tenant_name = await _TENANT_NAME_CACHE.get(tenant_id, lambda: _fetch_tenant_name(tenant_id))
+    if tenant_name is None:
+        # Don't remember misses - the tenant may be created shortly
+        _TENANT_NAME_CACHE.invalidate(tenant_id)
+    return tenant_name
+
+async def _authenticate_api_key(api_key: str) -> str:
+    """Resolve a tenant API key to its tenant id, raising 401 if invalid"""
+    response = await get_supabase_client().post(
+        "/rest/v1/rpc/authenticate_tenant_by_api_key",
+        json={"api_key_input": api_key}
+    )
+
+    if response.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+
+    tenant_id = parse_json(response)
+    if not tenant_id:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+
+    return tenant_id
 
 async def get_current_admin_user(
     authorization: str = Header(None),
@@ -39,8 +151,12 @@ async def get_current_admin_user(
     api_key = authorization.replace("Bearer ", "")
 
     try:
-        # Check if super admin
-        if api_key == SUPER_ADMIN_KEY:
+        # Check if super admin (constant-time compare to avoid a timing oracle)
+        if hmac.compare_digest(api_key.encode(), _SUPER_ADMIN_KEY_BYTES):
+            # A malformed X-Tenant-ID can never match a tenant, so don't
+            # spend a Supabase round-trip looking it up
+            x_tenant_id = parse_tenant_id(x_tenant_id)
+
             # Super admin mode
             result = {
                 "is_super_admin": True,
@@ -51,68 +167,32 @@ async def get_current_admin_user(
 
             # If viewing a specific tenant, get tenant name
             if x_tenant_id:
-                async with httpx.AsyncClient() as client:
-                    tenant_response = await client.get(
-                        f"{os.getenv('SUPABASE_URL')}/rest/v1/tenants",
-                        headers={
-                            "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                            "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                        },
-                        params={"id": f"eq.{x_tenant_id}", "select": "name"}
-                    )
-                    if tenant_response.status_code == 200:
-                        tenants = tenant_response.json()
-                        if tenants:
-                            result["tenant_name"] = tenants[0]["name"]
+                tenant_name = await get_tenant_name(x_tenant_id)
+                if tenant_name:
+                    result["tenant_name"] = tenant_name
 
             return result
 
-        # Regular tenant authentication
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/rpc/authenticate_tenant_by_api_key",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}",
-                    "Content-Type": "application/json"
-                },
-                json={"api_key_input": api_key}
-            )
+        # Regular tenant authentication (cached by API-key hash)
+        tenant_id = await _API_KEY_TENANT_CACHE.get(
+            _api_key_cache_key(api_key),
+            lambda: _authenticate_api_key(api_key)
+        )
 
-            if response.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid API key")
+        # Get tenant info
+        tenant_name = await get_tenant_name(tenant_id) or "Unknown"
 
-            tenant_id = response.json()
-            if not tenant_id:
-                raise HTTPException(status_code=401, detail="Invalid API key")
-
-            # Get tenant info
-            tenant_response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/tenants",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params={"id": f"eq.{tenant_id}", "select": "id,name,created_at"}
-            )
-
-            tenant_name = "Unknown"
-            if tenant_response.status_code == 200:
-                tenants = tenant_response.json()
-                if tenants:
-                    tenant_name = tenants[0]["name"]
-
-            return {
-                "is_super_admin": False,
-                "tenant_id": tenant_id,
-                "tenant_name": tenant_name,
-                "can_switch_tenants": False
-            }
+        return {
+            "is_super_admin": False,
+            "tenant_id": tenant_id,
+            "tenant_name": tenant_name,
+            "can_switch_tenants": False
+        }
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Admin authentication error: {e}")
+        logger.error("Admin authentication error: %s", e)
         raise HTTPException(status_code=500, detail="Authentication system error")
 
 # ============================================
@@ -149,126 +229,97 @@ async def admin_dashboard(request: Request):
         {"request": request, "page_title": "Admin Dashboard"}
     )
 
-async def get_session_user(request: Request) -> dict:
-    """Get current user from session"""
+@dataclass(slots=True)
+class SessionUser:
+    """Logged-in admin, parsed once per request from the session cookie"""
+    user_id: str
+    role: str
+    tenant_id: Optional[str] = None
+    tenant_name: Optional[str] = None
+
+    @property
+    def is_super_admin(self) -> bool:
+        return self.role == "super_admin"
+
+async def get_session_user(request: Request) -> SessionUser:
+    """Get current user from session (FastAPI dependency)"""
     user_session = request.session.get("user")
     if not user_session:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    return user_session
+    return SessionUser(
+        user_id=user_session["user_id"],
+        role=user_session["role"],
+        tenant_id=user_session.get("tenant_id"),
+        tenant_name=user_session.get("tenant_name")
+    )
+
+# Dashboard counts per tenant (None = all tenants). Served from memory for
+# 30s, then served stale for up to 5 minutes while a background refresh runs.
+# The stats depend on the session's tenant, so the browser always revalidates
+# them (ETag) instead of reusing a copy across logins.
+_DASHBOARD_STATS_CACHE = StaleWhileRevalidateCache(maxsize=1024, fresh_ttl=30, stale_ttl=300)
+
+async def get_admin_dashboard_stats(tenant_id: Optional[str]) -> dict:
+    """
+    Get dashboard counts from the admin_dashboard_stats RPC
+
+    Args:
+        tenant_id: Tenant to count for, or None for all tenants
+
+    Returns:
+        Dict with tenants, users, sites, voice_notes and timesheet_entries counts
+    """
+    response = await get_supabase_client().post(
+        "/rest/v1/rpc/admin_dashboard_stats",
+        json={"p_tenant_id": tenant_id}
+    )
+    response.raise_for_status()
+    return parse_json(response)
 
 @router.get("/admin/dashboard/stats")
-async def get_dashboard_stats(request: Request):
+async def get_dashboard_stats(request: Request, user: SessionUser = Depends(get_session_user)):
     """Get dashboard statistics"""
-    user_session = await get_session_user(request)
-    tenant_id = user_session.get("tenant_id")
-    is_super_admin = user_session.get("role") == "super_admin"
+    tenant_id = user.tenant_id
+    is_super_admin = user.is_super_admin
 
     # Super admin without tenant selected sees aggregate stats
     if is_super_admin and not tenant_id:
         try:
-            async with httpx.AsyncClient() as client:
-                # Get total counts across all tenants
-                users_response = await client.get(
-                    f"{os.getenv('SUPABASE_URL')}/rest/v1/users",
-                    headers={
-                        "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                        "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                    },
-                    params={"select": "id"}
-                )
-                user_count = len(users_response.json()) if users_response.status_code == 200 else 0
-
-                # Get tenant count
-                tenants_response = await client.get(
-                    f"{os.getenv('SUPABASE_URL')}/rest/v1/tenants",
-                    headers={
-                        "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                        "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                    },
-                    params={"select": "id"}
-                )
-                tenant_count = len(tenants_response.json()) if tenants_response.status_code == 200 else 0
-
-                return {
-                    "success": True,
-                    "stats": {
-                        "tenants": tenant_count,
-                        "users": user_count,
-                        "sites": 0,  # Aggregate calculation can be added
-                        "voice_notes": 0,
-                        "timesheet_entries": 0
-                    },
-                    "tenant_name": "All Tenants",
-                    "is_super_admin": True
-                }
+            # All counts in one round-trip (migrations/006), cached
+            stats = await _DASHBOARD_STATS_CACHE.get(None, lambda: get_admin_dashboard_stats(None))
+
+            return cached_json_response(request, *render_json({
+                "success": True,
+                "stats": stats,
+                "tenant_name": "All Tenants",
+                "is_super_admin": True
+            }), max_age=0)
         except Exception as e:
-            logger.error(f"Error fetching super admin stats: {e}")
+            logger.error("Error fetching super admin stats: %s", e)
             return {"success": False, "error": str(e)}
 
-    try:
-        async with httpx.AsyncClient() as client:
-            # Get user count
-            users_response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/users",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params={"tenant_id": f"eq.{tenant_id}", "select": "id"}
-            )
-            user_count = len(users_response.json()) if users_response.status_code == 200 else 0
-
-            # Get site count
-            sites_response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/entities",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params={"tenant_id": f"eq.{tenant_id}", "entity_type": "eq.sites", "select": "id"}
-            )
-            site_count = len(sites_response.json()) if sites_response.status_code == 200 else 0
-
-            # Get voice notes count
-            notes_response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/voice_notes",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params={"tenant_id": f"eq.{tenant_id}", "select": "id"}
-            )
-            notes_count = len(notes_response.json()) if notes_response.status_code == 200 else 0
-
-            # Get timesheet entries count (if table exists)
-            timesheet_count = 0
-            try:
-                timesheet_response = await client.get(
-                    f"{os.getenv('SUPABASE_URL')}/rest/v1/timesheet_entries",
-                    headers={
-                        "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                        "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                    },
-                    params={"tenant_id": f"eq.{tenant_id}", "select": "id"}
-                )
-                if timesheet_response.status_code == 200:
-                    timesheet_count = len(timesheet_response.json())
-            except:
-                pass
+    # The RPC treats a NULL tenant as "all tenants", so a tenant admin without
+    # a tenant must not reach it (or share the super-admin cache key)
+    if not tenant_id:
+        return {"success": False, "error": "No tenant assigned to this account"}
 
-            return {
-                "success": True,
-                "stats": {
-                    "users": user_count,
-                    "sites": site_count,
-                    "voice_notes": notes_count,
-                    "timesheet_entries": timesheet_count
-                },
-                "tenant_name": user_session.get("tenant_name", "Unknown")
-            }
+    try:
+        # All four counts in one round-trip (migrations/006), cached
+        stats = await _DASHBOARD_STATS_CACHE.get(tenant_id, lambda: get_admin_dashboard_stats(tenant_id))
+
+        return cached_json_response(request, *render_json({
+            "success": True,
+            "stats": {
+                "users": stats["users"],
+                "sites": stats["sites"],
+                "voice_notes": stats["voice_notes"],
+                "timesheet_entries": stats["timesheet_entries"]
+            },
+            "tenant_name": user.tenant_name or "Unknown"
+        }), max_age=0)
 
     except Exception as e:
-        logger.error(f"Error fetching dashboard stats: {e}")
+        logger.error("Error fetching dashboard stats: %s", e)
         return {"success": False, "error": str(e)}
 
 # ============================================
@@ -283,48 +334,52 @@ async def list_tenants_page(request: Request):
         {"request": request, "page_title": "Tenant Management"}
     )
 
+# Rendered tenants payloads, keyed by (is_super_admin, tenant_id). Tenants
+# are created out-of-band (scripts/migrations), so a short TTL is enough.
+# The payload depends on the session, so the browser always revalidates it.
+_TENANTS_DATA_CACHE = TTLCache(maxsize=64, ttl=30)
+
 @router.get("/admin/tenants/data")
-async def get_tenants_data(request: Request):
+async def get_tenants_data(request: Request, user: SessionUser = Depends(get_session_user)):
     """Get tenants data (HTMX endpoint)"""
-    user_session = await get_session_user(request)
-    tenant_id = user_session.get("tenant_id")
-    is_super_admin = user_session.get("role") == "super_admin"
+    tenant_id = user.tenant_id
+    is_super_admin = user.is_super_admin
 
-    try:
-        async with httpx.AsyncClient() as client:
-            # Super admin sees all tenants
-            if is_super_admin:
-                if tenant_id:
-                    # Viewing specific tenant
-                    params = {"id": f"eq.{tenant_id}", "select": "id,name,created_at,timezone"}
-                else:
-                    # Viewing all tenants
-                    params = {"select": "id,name,created_at,timezone", "order": "created_at.desc"}
-            else:
-                # Regular tenant admin sees only their tenant
-                params = {"id": f"eq.{tenant_id}", "select": "id,name,created_at,timezone"}
-
-            response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/tenants",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params=params
-            )
+    cache_key = (is_super_admin, tenant_id)
+    cached = _TENANTS_DATA_CACHE.get(cache_key)
+    if cached is not None:
+        return cached_json_response(request, *cached, max_age=0)
 
-            if response.status_code == 200:
-                tenants = response.json()
-                return {
-                    "success": True,
-                    "tenants": tenants,
-                    "is_super_admin": is_super_admin
-                }
+    try:
+        # Super admin sees all tenants
+        if is_super_admin:
+            if tenant_id:
+                # Viewing specific tenant
+                params = {"id": f"eq.{tenant_id}", "select": TENANT_COLUMNS}
             else:
-                return {"success": False, "error": "Failed to fetch tenants"}
+                # Viewing all tenants
+                params = {"select": TENANT_COLUMNS, "order": "created_at.desc"}
+        else:
+            # Regular tenant admin sees only their tenant
+            params = {"id": f"eq.{tenant_id}", "select": TENANT_COLUMNS}
+
+        client = get_supabase_client()
+        response = await client.get("/rest/v1/tenants", params=params)
+
+        if response.status_code == 200:
+            tenants = parse_json(response)
+            rendered = render_json({
+                "success": True,
+                "tenants": tenants,
+                "is_super_admin": is_super_admin
+            })
+            _TENANTS_DATA_CACHE[cache_key] = rendered
+            return cached_json_response(request, *rendered, max_age=0)
+        else:
+            return {"success": False, "error": "Failed to fetch tenants"}
 
     except Exception as e:
-        logger.error(f"Error fetching tenants: {e}")
+        logger.error("Error fetching tenants: %s", e)
         return {"success": False, "error": str(e)}
 
 # ============================================
@@ -339,401 +394,431 @@ async def list_users_page(request: Request):
         {"request": request, "page_title": "User Management"}
     )
 
+# The tenant switcher list is loaded on most admin pages but only changes
+# when tenants are added (via scripts), so each worker keeps it for a minute.
+# It is super-admin only, so the browser must revalidate it on every load
+# (ETag) rather than reuse it after a different login.
+_TENANTS_LIST_CACHE = TTLCache(maxsize=1, ttl=60)
+
 @router.get("/admin/api/tenants-list")
-async def get_tenants_list(request: Request):
+async def get_tenants_list(request: Request, user: SessionUser = Depends(get_session_user)):
     """Get list of all tenants (for tenant switcher dropdown)"""
-    user_session = await get_session_user(request)
-    is_super_admin = user_session.get("role") == "super_admin"
+    is_super_admin = user.is_super_admin
 
     if not is_super_admin:
-        return {"success": False, "error": "Unauthorized"}
+        raise HTTPException(status_code=403, detail="Super admin access required")
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/tenants",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params={"select": "id,name", "order": "name.asc"}
-            )
+    cached = _TENANTS_LIST_CACHE.get("all")
+    if cached is not None:
+        return cached_json_response(request, *cached, max_age=0)
 
-            if response.status_code == 200:
-                tenants = response.json()
-                return {"success": True, "tenants": tenants}
-            else:
-                return {"success": False, "error": "Failed to fetch tenants"}
+    try:
+        client = get_supabase_client()
+        response = await client.get(
+            "/rest/v1/tenants",
+            params={"select": "id,name", "order": "name.asc"}
+        )
+
+        if response.status_code == 200:
+            rendered = render_json({"success": True, "tenants": parse_json(response)})
+            _TENANTS_LIST_CACHE["all"] = rendered
+            return cached_json_response(request, *rendered, max_age=0)
+        else:
+            return {"success": False, "error": "Failed to fetch tenants"}
 
     except Exception as e:
-        logger.error(f"Error fetching tenants list: {e}")
+        logger.error("Error fetching tenants list: %s", e)
         return {"success": False, "error": str(e)}
 
+USERS_PAGE_SIZE = 100
+USERS_MAX_PAGE_SIZE = 500
+
+# Rendered user list pages keyed by (tenant_id or None for all tenants,
+# limit, offset, q). The users page is polled, so repeat loads are served
+# from memory. Cleared on every user/skill write in this worker; the short
+# TTL bounds how long other workers can serve a stale page.
+_USERS_DATA_CACHE = TTLCache(maxsize=256, ttl=15)
+
+def invalidate_users_data():
+    """Drop cached user list pages after a user or user-skill change"""
+    _USERS_DATA_CACHE.clear()
+
 @router.get("/admin/users/data")
 async def get_users_data(
     request: Request,
-    tenant_id: Optional[str] = None
+    user: SessionUser = Depends(get_session_user),
+    tenant_id: Optional[str] = None,
+    limit: int = USERS_PAGE_SIZE,
+    offset: int = 0,
+    q: Optional[str] = None
 ):
-    """Get users data (HTMX endpoint)"""
-    user_session = await get_session_user(request)
-    session_tenant_id = user_session.get("tenant_id")
-    is_super_admin = user_session.get("role") == "super_admin"
+    """Get users data (HTMX endpoint), one page at a time, optionally filtered by name"""
+    session_tenant_id = user.tenant_id
+    is_super_admin = user.is_super_admin
+
+    limit = max(1, min(limit, USERS_MAX_PAGE_SIZE))
+    offset = max(0, offset)
+    q = q.strip() if q else None
 
     # For tenant admins, always use their tenant_id
     # For super admins, use the query parameter if provided, otherwise show all
     if not is_super_admin:
         tenant_id = session_tenant_id
+        # None is the all-tenants cache key, so never let it through here
+        if not tenant_id:
+            return {"success": False, "error": "No tenant assigned to this account"}
     # else: use the tenant_id from query params (can be None for "all tenants")
 
-    # Super admin without tenant selected sees all users
-    if is_super_admin and not tenant_id:
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{os.getenv('SUPABASE_URL')}/rest/v1/users",
-                    headers={
-                        "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                        "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                    },
-                    params={
-                        "select": "id,name,phone_number,email,role,is_active,created_at,tenants(name)",
-                        "order": "created_at.desc",
-                        "limit": "100"
-                    }
-                )
-
-                if response.status_code == 200:
-                    users = response.json()
-
-                    # Add tenant names
-                    for user in users:
-                        user["tenant_name"] = user.get("tenants", {}).get("name", "Unknown") if user.get("tenants") else "Unknown"
-                        user["skills"] = []  # Initialize
-
-                    # Batch fetch all skills for all users in ONE query
-                    if users:
-                        user_ids = [u["id"] for u in users]
-                        skills_response = await client.get(
-                            f"{os.getenv('SUPABASE_URL')}/rest/v1/user_skills",
-                            headers={
-                                "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                                "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                            },
-                            params={
-                                "user_id": f"in.({','.join(user_ids)})",
-                                "is_enabled": "eq.true",
-                                "select": "user_id,skills(id,skill_key,name)"
-                            }
-                        )
-
-                        if skills_response.status_code == 200:
-                            all_skills = skills_response.json()
-                            # Group skills by user_id
-                            skills_by_user = {}
-                            for item in all_skills:
-                                if item.get("skills"):
-                                    user_id = item["user_id"]
-                                    if user_id not in skills_by_user:
-                                        skills_by_user[user_id] = []
-                                    skills_by_user[user_id].append({
-                                        "id": item["skills"]["id"],
-                                        "key": item["skills"]["skill_key"],
-                                        "name": item["skills"]["name"]
-                                    })
-
-                            # Assign skills to users
-                            for user in users:
-                                user["skills"] = skills_by_user.get(user["id"], [])
-
-                    return {"success": True, "users": users, "is_super_admin": True}
-                else:
-                    return {"success": False, "error": "Failed to fetch users"}
-        except Exception as e:
-            logger.error(f"Error fetching all users: {e}")
-            return {"success": False, "error": str(e)}
+    cache_key = (tenant_id, limit, offset, q)
+    cached = _USERS_DATA_CACHE.get(cache_key)
+    if cached is not None:
+        return cached_json_response(request, *cached, max_age=0)
+
+    # Super admin without tenant selected sees all users (with tenant names)
+    all_tenants = is_super_admin and not tenant_id
+
+    params = {
+        "select": USER_WITH_TENANT_AND_SKILLS_COLUMNS if all_tenants else USER_WITH_SKILLS_COLUMNS,
+        "order": "created_at.desc",
+        "limit": str(limit),
+        "offset": str(offset)
+    }
+    if not all_tenants:
+        params["tenant_id"] = f"eq.{tenant_id}"
+    if q:
+        params["name"] = f"ilike.*{q}*"
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/users",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params={
-                    "tenant_id": f"eq.{tenant_id}",
-                    "select": "id,name,phone_number,email,role,is_active,created_at",
-                    "order": "created_at.desc"
-                }
-            )
+        client = get_supabase_client()
+        # Rows come back already shaped for the UI (migrations/014)
+        response = await client.get(
+            "/rest/v1/users_with_skills",
+            headers=PREFER_COUNT_EXACT,
+            params=params
+        )
+
+        # 206 when the page doesn't cover every row
+        if response.status_code in (200, 206):
+            result = {
+                "success": True,
+                "users": parse_json(response),
+                "total": parse_content_range_total(response.headers.get("content-range")),
+                "limit": limit,
+                "offset": offset
+            }
+            if all_tenants:
+                result["is_super_admin"] = True
 
-            if response.status_code == 200:
-                users = response.json()
-
-                # Initialize skills array for all users
-                for user in users:
-                    user["skills"] = []
-
-                # Batch fetch all skills for all users in ONE query
-                if users:
-                    user_ids = [u["id"] for u in users]
-                    skills_response = await client.get(
-                        f"{os.getenv('SUPABASE_URL')}/rest/v1/user_skills",
-                        headers={
-                            "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                            "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                        },
-                        params={
-                            "user_id": f"in.({','.join(user_ids)})",
-                            "is_enabled": "eq.true",
-                            "select": "user_id,skills(id,skill_key,name)"
-                        }
-                    )
-
-                    if skills_response.status_code == 200:
-                        all_skills = skills_response.json()
-                        # Group skills by user_id
-                        skills_by_user = {}
-                        for item in all_skills:
-                            if item.get("skills"):
-                                user_id = item["user_id"]
-                                if user_id not in skills_by_user:
-                                    skills_by_user[user_id] = []
-                                skills_by_user[user_id].append({
-                                    "id": item["skills"]["id"],
-                                    "key": item["skills"]["skill_key"],
-                                    "name": item["skills"]["name"]
-                                })
-
-                        # Assign skills to users
-                        for user in users:
-                            user["skills"] = skills_by_user.get(user["id"], [])
-
-                return {"success": True, "users": users}
-            else:
-                return {"success": False, "error": "Failed to fetch users"}
+            # Edits reload the list right away, so always revalidate (ETag)
+            rendered = render_json(result)
+            _USERS_DATA_CACHE[cache_key] = rendered
+            return cached_json_response(request, *rendered, max_age=0)
+        else:
+            return {"success": False, "error": "Failed to fetch users"}
 
     except Exception as e:
-        logger.error(f"Error fetching users: {e}")
+        logger.error("Error fetching users: %s", e)
         return {"success": False, "error": str(e)}
 
 @router.post("/admin/users/{user_id}/toggle-active")
 async def toggle_user_active(
-    user_id: str,
-    request: Request
+    request: Request,
+    user_id: str = Path(pattern=UUID_PATTERN),
+    user: SessionUser = Depends(get_session_user)
 ):
     """Toggle user active status (HTMX endpoint)"""
-    user_session = await get_session_user(request)
-    tenant_id = user_session.get("tenant_id")
-    is_super_admin = user_session.get("role") == "super_admin"
+    tenant_id = user.tenant_id
+    is_super_admin = user.is_super_admin
+
+    # The RPC treats a NULL tenant as "any tenant", so a tenant admin must have one
+    if not is_super_admin and not tenant_id:
+        return {"success": False, "error": "No tenant assigned to this account"}
 
     try:
-        async with httpx.AsyncClient() as client:
-            # Get current status
-            params = {"id": f"eq.{user_id}", "select": "is_active"}
-            # Only filter by tenant_id if user is not super admin
-            if not is_super_admin and tenant_id:
-                params["tenant_id"] = f"eq.{tenant_id}"
-
-            get_response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/users",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params=params
-            )
+        client = get_supabase_client()
+        # Flip is_active in one UPDATE (migrations/008). Tenant admins can
+        # only toggle users in their own tenant.
+        response = await client.post(
+            "/rest/v1/rpc/toggle_user_active",
+            json={
+                "p_user_id": user_id,
+                "p_tenant_id": None if is_super_admin else tenant_id
+            }
+        )
 
-            if get_response.status_code != 200 or not get_response.json():
-                return {"success": False, "error": "User not found"}
+        if response.status_code != 200:
+            return {"success": False, "error": "Failed to update user"}
 
-            current_status = get_response.json()[0]["is_active"]
-            new_status = not current_status
-
-            # Update status
-            update_response = await client.patch(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/users",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=minimal"
-                },
-                params={"id": f"eq.{user_id}"},
-                json={"is_active": new_status}
-            )
+        new_status = parse_json(response)
+        if new_status is None:
+            return {"success": False, "error": "User not found"}
 
-            if update_response.status_code in [200, 204]:
-                return {"success": True, "is_active": new_status}
-            else:
-                return {"success": False, "error": "Failed to update user"}
+        invalidate_users_data()
+        return {"success": True, "is_active": new_status}
 
     except Exception as e:
-        logger.error(f"Error toggling user status: {e}")
+        logger.error("Error toggling user status: %s", e)
         return {"success": False, "error": str(e)}
 
 @router.get("/admin/users/{user_id}/available-skills")
 async def get_available_skills_for_user(
-    user_id: str,
-    request: Request
+    request: Request,
+    user_id: str = Path(pattern=UUID_PATTERN),
+    user: SessionUser = Depends(get_session_user)
 ):
     """Get all available skills that user doesn't have yet"""
-    user_session = await get_session_user(request)
     try:
-        async with httpx.AsyncClient() as client:
-            # Get all skills from system
-            all_skills_response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/skills",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params={"select": "id,skill_key,name"}
-            )
-
-            # Get user's current skills
-            user_skills_response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/user_skills",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params={
-                    "user_id": f"eq.{user_id}",
-                    "is_enabled": "eq.true",
-                    "select": "skill_id"
-                }
-            )
-
-            if all_skills_response.status_code == 200 and user_skills_response.status_code == 200:
-                all_skills = all_skills_response.json()
-                user_skill_ids = {s["skill_id"] for s in user_skills_response.json()}
-
-                # Filter out skills user already has
-                available = [s for s in all_skills if s["id"] not in user_skill_ids]
-
-                return {"success": True, "skills": available}
-            else:
-                return {"success": False, "error": "Failed to fetch skills"}
+        client = get_supabase_client()
+        # Skills the user doesn't have enabled, via SQL anti-join (migrations/011)
+        response = await client.post(
+            "/rest/v1/rpc/available_skills_for_user",
+            params={"select": SKILL_COLUMNS},
+            json={"p_user_id": user_id}
+        )
+
+        if response.status_code == 200:
+            # Changes whenever a skill is added/removed, so always revalidate
+            rendered = render_json({"success": True, "skills": parse_json(response)})
+            return cached_json_response(request, *rendered, max_age=0)
+        else:
+            return {"success": False, "error": "Failed to fetch skills"}
 
     except Exception as e:
-        logger.error(f"Error fetching available skills: {e}")
+        logger.error("Error fetching available skills: %s", e)
         return {"success": False, "error": str(e)}
 
 @router.post("/admin/users/{user_id}/skills/{skill_id}/add")
 async def add_skill_to_user(
-    user_id: str,
-    skill_id: str,
-    request: Request
+    request: Request,
+    user_id: str = Path(pattern=UUID_PATTERN),
+    skill_id: str = Path(pattern=UUID_PATTERN),
+    user: SessionUser = Depends(get_session_user)
 ):
     """Add a skill to a user"""
-    user_session = await get_session_user(request)
     try:
-        async with httpx.AsyncClient() as client:
-            # Check if relationship already exists (might be disabled)
-            check_response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/user_skills",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params={
-                    "user_id": f"eq.{user_id}",
-                    "skill_id": f"eq.{skill_id}"
-                }
-            )
+        client = get_supabase_client()
+        # Insert the relationship, or re-enable it if it already exists
+        # (unique on user_id, skill_id - see migrations/009)
+        response = await client.post(
+            "/rest/v1/user_skills",
+            headers=PREFER_UPSERT_MINIMAL,
+            params={"on_conflict": "user_id,skill_id"},
+            json={
+                "user_id": user_id,
+                "skill_id": skill_id,
+                "is_enabled": True
+            }
+        )
 
-            if check_response.status_code == 200 and check_response.json():
-                # Relationship exists, just enable it
-                update_response = await client.patch(
-                    f"{os.getenv('SUPABASE_URL')}/rest/v1/user_skills",
-                    headers={
-                        "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                        "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}",
-                        "Content-Type": "application/json",
-                        "Prefer": "return=minimal"
-                    },
-                    params={
-                        "user_id": f"eq.{user_id}",
-                        "skill_id": f"eq.{skill_id}"
-                    },
-                    json={"is_enabled": True}
-                )
-
-                if update_response.status_code in [200, 204]:
-                    return {"success": True, "message": "Skill enabled"}
-                else:
-                    return {"success": False, "error": "Failed to enable skill"}
-            else:
-                # Create new relationship
-                import uuid
-                create_response = await client.post(
-                    f"{os.getenv('SUPABASE_URL')}/rest/v1/user_skills",
-                    headers={
-                        "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                        "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}",
-                        "Content-Type": "application/json",
-                        "Prefer": "return=minimal"
-                    },
-                    json={
-                        "id": str(uuid.uuid4()),
-                        "user_id": user_id,
-                        "skill_id": skill_id,
-                        "is_enabled": True
-                    }
-                )
-
-                if create_response.status_code in [200, 201]:
-                    return {"success": True, "message": "Skill added"}
-                else:
-                    logger.error(f"Failed to create user skill: {create_response.text}")
-                    return {"success": False, "error": "Failed to add skill"}
+        if response.status_code in [200, 201, 204]:
+            invalidate_users_data()
+            return {"success": True, "message": "Skill added"}
+        else:
+            logger.error("Failed to add user skill: %.500s", response.text)
+            return {"success": False, "error": "Failed to add skill"}
 
     except Exception as e:
-        logger.error(f"Error adding skill to user: {e}")
+        logger.error("Error adding skill to user: %s", e)
         return {"success": False, "error": str(e)}
 
 @router.delete("/admin/users/{user_id}/skills/{skill_id}")
 async def remove_skill_from_user(
-    user_id: str,
-    skill_id: str,
-    request: Request
+    request: Request,
+    user_id: str = Path(pattern=UUID_PATTERN),
+    skill_id: str = Path(pattern=UUID_PATTERN),
+    user: SessionUser = Depends(get_session_user)
 ):
-    user_session = await get_session_user(request)
     """Remove a skill from a user (soft delete - set is_enabled = false)"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.patch(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/user_skills",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=minimal"
-                },
-                params={
-                    "user_id": f"eq.{user_id}",
-                    "skill_id": f"eq.{skill_id}"
-                },
-                json={"is_enabled": False}
+        client = get_supabase_client()
+        response = await client.patch(
+            "/rest/v1/user_skills",
+            headers=PREFER_RETURN_MINIMAL,
+            params={
+                "user_id": f"eq.{user_id}",
+                "skill_id": f"eq.{skill_id}"
+            },
+            json={"is_enabled": False}
+        )
+
+        if response.status_code in [200, 204]:
+            invalidate_users_data()
+            return {"success": True, "message": "Skill removed"}
+        else:
+            return {"success": False, "error": "Failed to remove skill"}
+
+    except Exception as e:
+        logger.error("Error removing skill from user: %s", e)
+        return {"success": False, "error": str(e)}
+
+async def users_in_tenant(user_ids: List[str], tenant_id: str) -> Set[str]:
+    """
+    Filter user ids down to the users that belong to a tenant
+
+    Args:
+        user_ids: Validated user UUIDs
+        tenant_id: Tenant the users must belong to
+
+    Returns:
+        The ids from user_ids that exist in the tenant
+    """
+    response = await get_supabase_client().get(
+        "/rest/v1/users",
+        params={
+            "select": "id",
+            "id": f"in.({','.join(user_ids)})",
+            "tenant_id": f"eq.{tenant_id}"
+        }
+    )
+    response.raise_for_status()
+    return {row["id"] for row in parse_json(response)}
+
+@router.put("/admin/users/{user_id}/skills")
+async def set_user_skills(
+    request: Request,
+    user_id: str = Path(pattern=UUID_PATTERN),
+    user: SessionUser = Depends(get_session_user)
+):
+    """
+    Set a user's full skill list in one call
+
+    Body: {"skill_ids": [...]}. Listed skills are enabled (inserted or
+    re-enabled), every other skill the user has is disabled.
+    """
+    try:
+        body = await request.json()
+        skill_ids = body.get("skill_ids")
+
+        if not is_uuid_list(skill_ids):
+            return {"success": False, "error": "skill_ids must be a list of skill ids"}
+
+        # Tenant admins can only change users in their own tenant
+        if not user.is_super_admin:
+            if not user.tenant_id or not await users_in_tenant([user_id], user.tenant_id):
+                return {"success": False, "error": "User not found"}
+
+        # A repeated id (in any letter case) would make Postgres reject the
+        # whole upsert ("cannot affect row a second time")
+        skill_ids = list(dict.fromkeys(skill_id.lower() for skill_id in skill_ids))
+
+        client = get_supabase_client()
+
+        # Enable the requested skills first (bulk upsert on user_id, skill_id),
+        # so a failure (e.g. unknown skill id) leaves the other skills alone
+        if skill_ids:
+            response = await client.post(
+                "/rest/v1/user_skills",
+                headers=PREFER_UPSERT_MINIMAL,
+                params={"on_conflict": "user_id,skill_id"},
+                json=[
+                    {"user_id": user_id, "skill_id": skill_id, "is_enabled": True}
+                    for skill_id in skill_ids
+                ]
             )
+            if response.status_code not in [200, 201, 204]:
+                logger.error("Failed to set user skills: %.500s", response.text)
+                return {"success": False, "error": "Failed to update skills"}
+            invalidate_users_data()
+
+        # Then disable everything else
+        disable_params = {"user_id": f"eq.{user_id}", "is_enabled": "eq.true"}
+        if skill_ids:
+            disable_params["skill_id"] = f"not.in.({','.join(skill_ids)})"
+        response = await client.patch(
+            "/rest/v1/user_skills",
+            headers=PREFER_RETURN_MINIMAL,
+            params=disable_params,
+            json={"is_enabled": False}
+        )
+        invalidate_users_data()
+
+        if response.status_code not in [200, 204]:
+            logger.error("Failed to set user skills: %.500s", response.text)
+            return {"success": False, "error": "Failed to update skills"}
+
+        return {"success": True, "message": "Skills updated"}
 
-            if response.status_code in [200, 204]:
-                return {"success": True, "message": "Skill removed"}
-            else:
-                return {"success": False, "error": "Failed to remove skill"}
+    except Exception as e:
+        logger.error("Error setting user skills: %s", e)
+        return {"success": False, "error": str(e)}
+
+# Upper bound on len(user_ids) * len(skill_ids) for one bulk request
+BULK_USER_SKILLS_MAX_ROWS = 1000
+
+@router.post("/admin/users/skills/bulk")
+async def add_skills_to_users(
+    request: Request,
+    user: SessionUser = Depends(get_session_user)
+):
+    """
+    Enable a set of skills for a set of users in one call
+
+    Body: {"user_ids": [...], "skill_ids": [...]}. Every listed skill is
+    enabled (inserted or re-enabled) for every listed user; other skills
+    are left alone.
+    """
+    try:
+        body = await request.json()
+        user_ids = body.get("user_ids")
+        skill_ids = body.get("skill_ids")
+
+        if not is_uuid_list(user_ids) or not is_uuid_list(skill_ids):
+            return {"success": False, "error": "user_ids and skill_ids must be lists of ids"}
+
+        # A repeated pair (in any letter case) would make Postgres reject the
+        # whole upsert ("cannot affect row a second time")
+        user_ids = list(dict.fromkeys(user_id.lower() for user_id in user_ids))
+        skill_ids = list(dict.fromkeys(skill_id.lower() for skill_id in skill_ids))
+
+        if not user_ids or not skill_ids:
+            return {"success": True, "message": "Nothing to update"}
+
+        if len(user_ids) * len(skill_ids) > BULK_USER_SKILLS_MAX_ROWS:
+            return {
+                "success": False,
+                "error": f"Too many user/skill pairs (max {BULK_USER_SKILLS_MAX_ROWS} per request)"
+            }
+
+        # Tenant admins can only change users in their own tenant
+        if not user.is_super_admin:
+            if not user.tenant_id:
+                return {"success": False, "error": "No tenant selected"}
+            tenant_user_ids = await users_in_tenant(user_ids, user.tenant_id)
+            user_ids = [user_id for user_id in user_ids if user_id in tenant_user_ids]
+            if not user_ids:
+                return {"success": False, "error": "Users not found"}
+
+        client = get_supabase_client()
+        # One bulk upsert on (user_id, skill_id) instead of a request per pair
+        response = await client.post(
+            "/rest/v1/user_skills",
+            headers=PREFER_UPSERT_MINIMAL,
+            params={"on_conflict": "user_id,skill_id"},
+            json=[
+                {"user_id": user_id, "skill_id": skill_id, "is_enabled": True}
+                for user_id in user_ids
+                for skill_id in skill_ids
+            ]
+        )
+
+        if response.status_code in [200, 201, 204]:
+            invalidate_users_data()
+            return {"success": True, "message": "Skills added"}
+        else:
+            logger.error("Failed to bulk add user skills: %.500s", response.text)
+            return {"success": False, "error": "Failed to add skills"}
 
     except Exception as e:
-        logger.error(f"Error removing skill from user: {e}")
+        logger.error("Error bulk adding skills: %s", e)
         return {"success": False, "error": str(e)}
 
 @router.put("/admin/users/{user_id}")
 async def update_user(
-    user_id: str,
-    request: Request
+    request: Request,
+    user_id: str = Path(pattern=UUID_PATTERN),
+    user: SessionUser = Depends(get_session_user)
 ):
     """Update user details (name, phone, email, role)"""
-    user_session = await get_session_user(request)
     try:
         body = await request.json()
         name = body.get("name")
@@ -744,44 +829,43 @@ async def update_user(
         if not name or not phone_number:
             return {"success": False, "error": "Name and phone number are required"}
 
-        async with httpx.AsyncClient() as client:
-            update_data = {
-                "name": name,
-                "phone_number": phone_number,
-                "email": email if email else None,
-                "role": role if role else None
-            }
-
-            response = await client.patch(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/users",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=representation"
-                },
-                params={"id": f"eq.{user_id}"},
-                json=update_data
-            )
-
-            if response.status_code == 200:
-                updated_user = response.json()[0] if response.json() else None
-                return {"success": True, "user": updated_user}
-            else:
-                logger.error(f"Failed to update user: {response.text}")
-                return {"success": False, "error": "Failed to update user"}
+        client = get_supabase_client()
+        update_data = {
+            "name": name,
+            "phone_number": phone_number,
+            "email": email if email else None,
+            "role": role if role else None
+        }
+
+        # The UI merges the returned row into its list, so only ask for the
+        # columns it shows
+        response = await client.patch(
+            "/rest/v1/users",
+            headers=PREFER_RETURN_REPRESENTATION,
+            params={"id": f"eq.{user_id}", "select": USER_COLUMNS},
+            json=update_data
+        )
+
+        if response.status_code == 200:
+            updated_users = parse_json(response)
+            updated_user = updated_users[0] if updated_users else None
+            invalidate_users_data()
+            return {"success": True, "user": updated_user}
+        else:
+            logger.error("Failed to update user: %.500s", response.text)
+            return {"success": False, "error": "Failed to update user"}
 
     except Exception as e:
-        logger.error(f"Error updating user: {e}")
+        logger.error("Error updating user: %s", e)
         return {"success": False, "error": str(e)}
 
 @router.post("/admin/users")
 async def create_user(
-    request: Request
+    request: Request,
+    user: SessionUser = Depends(get_session_user)
 ):
     """Create a new user"""
-    user_session = await get_session_user(request)
-    tenant_id = user_session.get("tenant_id")
+    tenant_id = user.tenant_id
 
     # Must have a specific tenant selected
     if not tenant_id:
@@ -801,56 +885,45 @@ async def create_user(
         if not phone_number.startswith("+"):
             return {"success": False, "error": "Phone number must include country code (e.g., +1)"}
 
-        async with httpx.AsyncClient() as client:
-            # Check if phone number already exists for this tenant
-            check_response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/users",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params={
-                    "tenant_id": f"eq.{tenant_id}",
-                    "phone_number": f"eq.{phone_number}"
-                }
-            )
-
-            if check_response.status_code == 200 and check_response.json():
-                return {"success": False, "error": "A user with this phone number already exists", "status": 409}
-
-            # Create new user
-            import uuid
-            user_data = {
-                "id": str(uuid.uuid4()),
-                "tenant_id": tenant_id,
-                "name": name,
-                "phone_number": phone_number,
-                "email": email if email else None,
-                "role": role,
-                "is_active": True  # New users are active by default
-            }
-
-            response = await client.post(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/users",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=representation"
-                },
-                json=user_data
-            )
-
-            if response.status_code in [200, 201]:
-                new_user = response.json()[0] if response.json() else None
-                logger.info(f"Created new user: {name} ({phone_number}) for tenant {tenant_id}")
-                return {"success": True, "user": new_user}
-            else:
-                logger.error(f"Failed to create user: {response.text}")
-                return {"success": False, "error": "Failed to create user"}
+        client = get_supabase_client()
+        # Create new user (id is generated by the database, see migrations/012)
+        user_data = {
+            "tenant_id": tenant_id,
+            "name": name,
+            "phone_number": phone_number,
+            "email": email if email else None,
+            "role": role,
+            "is_active": True  # New users are active by default
+        }
+
+        response = await client.post(
+            "/rest/v1/users",
+            headers=PREFER_RETURN_REPRESENTATION,
+            params={"select": USER_COLUMNS},
+            json=user_data
+        )
+
+        # Phone numbers are unique per tenant (migrations/013); PostgREST
+        # reports the unique violation as 409 with SQLSTATE 23505
+        if response.status_code == 409 and parse_json(response).get("code") == "23505":
+            return {"success": False, "error": "A user with this phone number already exists", "status": 409}
+
+        if response.status_code in [200, 201]:
+            # User counts changed
+            _DASHBOARD_STATS_CACHE.invalidate(tenant_id)
+            _DASHBOARD_STATS_CACHE.invalidate(None)
+            invalidate_users_data()
+
+            new_users = parse_json(response)
+            new_user = new_users[0] if new_users else None
+            logger.info("Created new user: %s (%s) for tenant %s", name, phone_number, tenant_id)
+            return {"success": True, "user": new_user}
+        else:
+            logger.error("Failed to create user: %.500s", response.text)
+            return {"success": False, "error": "Failed to create user"}
 
     except Exception as e:
-        logger.error(f"Error creating user: {e}")
+        logger.error("Error creating user: %s", e)
         return {"success": False, "error": str(e)}
 
 # ============================================
@@ -866,386 +939,244 @@ async def list_sites_page(request: Request):
     )
 
 @router.get("/admin/sites/data")
-async def get_sites_data(request: Request):
+async def get_sites_data(request: Request, user: SessionUser = Depends(get_session_user)):
     """Get sites data from entities table"""
-    user_session = await get_session_user(request)
-    tenant_id = user_session.get("tenant_id")
-    is_super_admin = user_session.get("role") == "super_admin"
-
-    try:
-        async with httpx.AsyncClient() as client:
-            params = {
-                "select": "id,name,address,tenant_id",
-                "entity_type": "eq.sites"  # Filter for sites only
-            }
-
-            # Apply tenant filter
-            if tenant_id and not is_super_admin:
-                params["tenant_id"] = f"eq.{tenant_id}"
-            elif tenant_id and is_super_admin:
-                params["tenant_id"] = f"eq.{tenant_id}"
-
-            response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/entities",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params=params
-            )
+    tenant_id = user.tenant_id
+    is_super_admin = user.is_super_admin
 
-            logger.info(f"Fetching sites from entities table: {response.status_code}, params: {params}")
+    # Without a tenant filter every tenant's sites would be returned
+    if not is_super_admin and not tenant_id:
+        return {"success": False, "error": "No tenant assigned to this account"}
 
-            if response.status_code == 200:
-                sites = response.json()
-                logger.info(f"Found {len(sites)} sites")
-                return {"success": True, "sites": sites}
-            else:
-                logger.error(f"Failed to fetch sites: {response.status_code} - {response.text}")
-                return {"success": False, "error": "Failed to fetch sites"}
+    try:
+        client = get_supabase_client()
+        params = {
+            "select": SITE_COLUMNS,
+            "entity_type": "eq.sites"  # Filter for sites only
+        }
+
+        # Apply tenant filter
+        if tenant_id and not is_super_admin:
+            params["tenant_id"] = f"eq.{tenant_id}"
+        elif tenant_id and is_super_admin:
+            params["tenant_id"] = f"eq.{tenant_id}"
+
+        response = await client.get(
+            "/rest/v1/entities",
+            params=params
+        )
+
+        logger.debug("Fetching sites from entities table: %s, params: %s", response.status_code, params)
+
+        if response.status_code == 200:
+            sites = parse_json(response)
+            logger.info("Found %d sites", len(sites))
+            rendered = render_json({"success": True, "sites": sites})
+            return cached_json_response(request, *rendered, max_age=0)
+        else:
+            logger.error("Failed to fetch sites: %s - %.500s", response.status_code, response.text)
+            return {"success": False, "error": "Failed to fetch sites"}
 
     except Exception as e:
-        logger.error(f"Error fetching sites: {e}")
+        logger.error("Error fetching sites: %s", e)
         return {"success": False, "error": str(e)}
 
 # ============================================
 # REPORTS
 # ============================================
 
+# Report pages are static shells (data is fetched by the page), so the
+# browser may reuse them. Report data depends on the session's tenant, so it
+# is always revalidated by ETag.
+REPORT_PAGE_CACHE_CONTROL = {"Cache-Control": "private, max-age=300"}
+
+def ndjson_report_response(result: dict) -> StreamingResponse:
+    """
+    Stream a report as NDJSON instead of one JSON document
+
+    The first line is the report without its entries (success, view,
+    summaries), followed by one line per entry, so clients can render
+    rows as they arrive instead of waiting for one large array.
+
+    Args:
+        result: Report payload with an "entries" list
+
+    Returns:
+        application/x-ndjson streaming response
+    """
+    entries = result.pop("entries")
+
+    def lines():
+        yield orjson.dumps(result) + b"\n"
+        for entry in entries:
+            yield orjson.dumps(entry) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.get("/admin/reports/timesheets", response_class=HTMLResponse)
 async def timesheets_report_page(request: Request):
     """Timesheets report page"""
     return templates.TemplateResponse(
         "reports/timesheets.html",
-        {"request": request, "page_title": "Timesheet Reports"}
+        {"request": request, "page_title": "Timesheet Reports"},
+        headers=REPORT_PAGE_CACHE_CONTROL
     )
 
 @router.get("/admin/reports/timesheets/data")
 async def get_timesheets_data(
     request: Request,
+    user: SessionUser = Depends(get_session_user),
     view: str = "all_users",
     user_id: Optional[str] = None,
     site_id: Optional[str] = None,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    tenant_id: Optional[str] = None  # Allow super admin to filter by tenant
+    start_date: Optional[date] = None,  # ISO dates; FastAPI rejects anything else (422)
+    end_date: Optional[date] = None,
+    tenant_id: Optional[str] = None,  # Allow super admin to filter by tenant
+    include_entries: bool = True,  # all_users view: set false to get only the summary
+    ndjson: bool = False  # stream the report as NDJSON (see ndjson_report_response)
 ):
     """Get timesheet data with filtering"""
-    user_session = await get_session_user(request)
-    session_tenant_id = user_session.get("tenant_id")
-    is_super_admin = user_session.get("role") == "super_admin"
+    session_tenant_id = user.tenant_id
+    is_super_admin = user.is_super_admin
 
     # For tenant admins, always use their session tenant_id
     # For super admins, use the query parameter if provided
     if not is_super_admin:
         tenant_id = session_tenant_id
+        # No tenant filter means every tenant's rows (the RPCs treat NULL
+        # the same way), so a tenant admin must have one
+        if not tenant_id:
+            return {"success": False, "error": "No tenant assigned to this account"}
+
+    # The individual view is computed from the entries, so it always needs them
+    if view != "all_users":
+        include_entries = True
+
+    filters = TimesheetFilters(
+        tenant_id=tenant_id,
+        user_id=user_id,
+        site_id=site_id,
+        start_date=start_date,
+        end_date=end_date
+    )
 
     try:
-        async with httpx.AsyncClient() as client:
-            # Build query params
-            # Note: sites are stored in entities table, we'll just get site_id and fetch names separately
-            params = {
-                "select": "id,work_date,start_time,end_time,hours_worked,work_description,plans_for_tomorrow,site_id,user_id,users(name)",
-                "order": "work_date.desc,start_time.desc"
-            }
+        # Per-user totals are aggregated in Postgres (migrations/010) and
+        # fetched alongside the entries
+        summary_list, timesheets = await fetch_timesheet_report(
+            get_supabase_client(),
+            filters,
+            summary_rpc=USER_SUMMARY_RPC if view == "all_users" else None,
+            include_entries=include_entries
+        )
+
+        # Calculate summary stats
+        if view == "all_users":
+            # Already grouped by user and sorted by total hours descending
+            total_hours = sum(u["total_hours"] for u in summary_list)
+            total_users = len(summary_list)
+            total_entries = sum(u["entry_count"] for u in summary_list)
 
-            # Apply tenant filter (always apply if tenant_id is set)
-            if tenant_id:
-                params["tenant_id"] = f"eq.{tenant_id}"
-
-            # Apply additional filters
-            if user_id:
-                params["user_id"] = f"eq.{user_id}"
-
-            if site_id:
-                params["site_id"] = f"eq.{site_id}"
-
-            if start_date and end_date:
-                # Use and operator for date range
-                params["and"] = f"(work_date.gte.{start_date},work_date.lte.{end_date})"
-            elif start_date:
-                params["work_date"] = f"gte.{start_date}"
-            elif end_date:
-                params["work_date"] = f"lte.{end_date}"
-
-            # Fetch timesheets
-            response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/timesheets",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
+            result = {
+                "success": True,
+                "view": view,
+                "summary": {
+                    "total_hours": round(total_hours, 2),
+                    "total_users": total_users,
+                    "total_entries": total_entries,
+                    "avg_hours_per_user": round(total_hours / total_users, 2) if total_users > 0 else 0
                 },
-                params=params
-            )
+                "user_summary": summary_list,
+                "entries": timesheets
+            }
+        else:
+            # Individual user view
+            result = {
+                "success": True,
+                "view": view,
+                "summary": summarize_entries(timesheets),
+                "entries": timesheets
+            }
 
-            logger.info(f"Fetching timesheets: {response.status_code}, params: {params}")
-
-            if response.status_code != 200:
-                logger.error(f"Supabase error: {response.status_code} - {response.text}")
-                return {"success": False, "error": f"Failed to fetch timesheets: {response.text}"}
-
-            if response.status_code == 200:
-                timesheets = response.json()
-                logger.info(f"Found {len(timesheets)} timesheets")
-
-                # Fetch site names from entities table
-                if timesheets:
-                    site_ids = list(set(entry.get("site_id") for entry in timesheets if entry.get("site_id")))
-                    if site_ids:
-                        # Fetch entities (sites) by IDs
-                        sites_response = await client.get(
-                            f"{os.getenv('SUPABASE_URL')}/rest/v1/entities",
-                            headers={
-                                "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                                "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                            },
-                            params={
-                                "id": f"in.({','.join(site_ids)})",
-                                "select": "id,name"
-                            }
-                        )
-
-                        if sites_response.status_code == 200:
-                            sites = {site["id"]: site["name"] for site in sites_response.json()}
-                            # Enrich timesheets with site names
-                            for entry in timesheets:
-                                if entry.get("site_id"):
-                                    entry["site_name"] = sites.get(entry["site_id"], "Unknown Site")
-                                else:
-                                    entry["site_name"] = "Unknown Site"
-                        else:
-                            # If sites fetch fails, just use Unknown
-                            for entry in timesheets:
-                                entry["site_name"] = "Unknown Site"
-                    else:
-                        for entry in timesheets:
-                            entry["site_name"] = "Unknown Site"
-
-                # Calculate summary stats
-                if view == "all_users":
-                    # Group by user
-                    user_summary = {}
-                    for entry in timesheets:
-                        user_id_key = entry["user_id"]
-                        user_name = entry.get("users", {}).get("name", "Unknown User")
-
-                        if user_id_key not in user_summary:
-                            user_summary[user_id_key] = {
-                                "user_id": user_id_key,
-                                "user_name": user_name,
-                                "total_hours": 0,
-                                "entry_count": 0,
-                                "days_worked": set()
-                            }
-
-                        user_summary[user_id_key]["total_hours"] += entry["hours_worked"]
-                        user_summary[user_id_key]["entry_count"] += 1
-                        user_summary[user_id_key]["days_worked"].add(entry["work_date"])
-
-                    # Convert to list and format
-                    summary_list = []
-                    for user_data in user_summary.values():
-                        summary_list.append({
-                            "user_id": user_data["user_id"],
-                            "user_name": user_data["user_name"],
-                            "total_hours": round(user_data["total_hours"], 2),
-                            "entry_count": user_data["entry_count"],
-                            "days_worked": len(user_data["days_worked"]),
-                            "avg_hours_per_day": round(user_data["total_hours"] / len(user_data["days_worked"]), 2) if user_data["days_worked"] else 0
-                        })
-
-                    # Sort by total hours descending
-                    summary_list.sort(key=lambda x: x["total_hours"], reverse=True)
-
-                    # Overall stats
-                    total_hours = sum(e["hours_worked"] for e in timesheets)
-                    total_users = len(user_summary)
-                    total_entries = len(timesheets)
-
-                    return {
-                        "success": True,
-                        "view": view,
-                        "summary": {
-                            "total_hours": round(total_hours, 2),
-                            "total_users": total_users,
-                            "total_entries": total_entries,
-                            "avg_hours_per_user": round(total_hours / total_users, 2) if total_users > 0 else 0
-                        },
-                        "user_summary": summary_list,
-                        "entries": timesheets
-                    }
-                else:
-                    # Individual user view
-                    total_hours = sum(e["hours_worked"] for e in timesheets)
-                    unique_days = len(set(e["work_date"] for e in timesheets))
-
-                    return {
-                        "success": True,
-                        "view": view,
-                        "summary": {
-                            "total_hours": round(total_hours, 2),
-                            "days_worked": unique_days,
-                            "total_entries": len(timesheets),
-                            "avg_hours_per_day": round(total_hours / unique_days, 2) if unique_days > 0 else 0
-                        },
-                        "entries": timesheets
-                    }
-            else:
-                return {"success": False, "error": "Failed to fetch timesheets"}
+        if ndjson:
+            return ndjson_report_response(result)
+
+        return cached_json_response(request, *render_json(result), max_age=0)
 
     except Exception as e:
-        logger.error(f"Error fetching timesheets: {e}")
+        logger.error("Error fetching timesheets: %s", e)
         return {"success": False, "error": str(e)}
 
 @router.get("/admin/reports/timesheets/by-site")
 async def get_timesheets_by_site(
     request: Request,
+    user: SessionUser = Depends(get_session_user),
     site_id: Optional[str] = None,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    tenant_id: Optional[str] = None  # Allow super admin to filter by tenant
+    start_date: Optional[date] = None,  # ISO dates; FastAPI rejects anything else (422)
+    end_date: Optional[date] = None,
+    tenant_id: Optional[str] = None,  # Allow super admin to filter by tenant
+    include_entries: bool = True,  # set false to get only the site totals
+    ndjson: bool = False  # stream the report as NDJSON (see ndjson_report_response)
 ):
     """Get timesheet data grouped by site"""
-    user_session = await get_session_user(request)
-    session_tenant_id = user_session.get("tenant_id")
-    is_super_admin = user_session.get("role") == "super_admin"
+    session_tenant_id = user.tenant_id
+    is_super_admin = user.is_super_admin
 
     # For tenant admins, always use their session tenant_id
     # For super admins, use the query parameter if provided
     if not is_super_admin:
         tenant_id = session_tenant_id
+        # No tenant filter means every tenant's rows (the RPCs treat NULL
+        # the same way), so a tenant admin must have one
+        if not tenant_id:
+            return {"success": False, "error": "No tenant assigned to this account"}
+
+    filters = TimesheetFilters(
+        tenant_id=tenant_id,
+        site_id=site_id,
+        start_date=start_date,
+        end_date=end_date
+    )
 
     try:
-        async with httpx.AsyncClient() as client:
-            # Build query params
-            params = {
-                "select": "id,work_date,start_time,end_time,hours_worked,work_description,plans_for_tomorrow,site_id,user_id,users(name)",
-                "order": "work_date.desc,start_time.desc"
-            }
-
-            # Apply tenant filter (always apply if tenant_id is set)
-            if tenant_id:
-                params["tenant_id"] = f"eq.{tenant_id}"
-
-            # Apply site filter if provided
-            if site_id:
-                params["site_id"] = f"eq.{site_id}"
-
-            # Apply date filter
-            if start_date and end_date:
-                params["and"] = f"(work_date.gte.{start_date},work_date.lte.{end_date})"
-            elif start_date:
-                params["work_date"] = f"gte.{start_date}"
-            elif end_date:
-                params["work_date"] = f"lte.{end_date}"
-
-            # Fetch timesheets
-            response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/timesheets",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                },
-                params=params
-            )
-
-            logger.info(f"Fetching timesheets by site: {response.status_code}, params: {params}")
-
-            if response.status_code != 200:
-                logger.error(f"Supabase error: {response.status_code} - {response.text}")
-                return {"success": False, "error": f"Failed to fetch timesheets: {response.text}"}
-
-            timesheets = response.json()
-            logger.info(f"Found {len(timesheets)} timesheets")
-
-            # Fetch site names from entities table
-            site_ids = list(set(entry.get("site_id") for entry in timesheets if entry.get("site_id")))
-            site_names = {}
-
-            if site_ids:
-                sites_response = await client.get(
-                    f"{os.getenv('SUPABASE_URL')}/rest/v1/entities",
-                    headers={
-                        "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                        "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}"
-                    },
-                    params={
-                        "id": f"in.({','.join(site_ids)})",
-                        "select": "id,name"
-                    }
-                )
-
-                if sites_response.status_code == 200:
-                    site_names = {site["id"]: site["name"] for site in sites_response.json()}
-
-            # Group timesheets by site
-            site_data = {}
-            for entry in timesheets:
-                entry_site_id = entry.get("site_id")
-                if not entry_site_id:
-                    entry_site_id = "no_site"
-                    site_name = "No Site Assigned"
-                else:
-                    site_name = site_names.get(entry_site_id, "Unknown Site")
-
-                # Enrich entry with site name
-                entry["site_name"] = site_name
-
-                # Group by site
-                if entry_site_id not in site_data:
-                    site_data[entry_site_id] = {
-                        "site_id": entry_site_id,
-                        "site_name": site_name,
-                        "total_hours": 0,
-                        "entry_count": 0,
-                        "user_count": set(),
-                        "days_worked": set(),
-                        "entries": []
-                    }
-
-                site_data[entry_site_id]["total_hours"] += entry["hours_worked"]
-                site_data[entry_site_id]["entry_count"] += 1
-                site_data[entry_site_id]["user_count"].add(entry["user_id"])
-                site_data[entry_site_id]["days_worked"].add(entry["work_date"])
-                site_data[entry_site_id]["entries"].append(entry)
-
-            # Convert to list and format
-            site_list = []
-            for site_info in site_data.values():
-                site_list.append({
-                    "site_id": site_info["site_id"],
-                    "site_name": site_info["site_name"],
-                    "total_hours": round(site_info["total_hours"], 2),
-                    "entry_count": site_info["entry_count"],
-                    "user_count": len(site_info["user_count"]),
-                    "days_worked": len(site_info["days_worked"]),
-                    "avg_hours_per_day": round(site_info["total_hours"] / len(site_info["days_worked"]), 2) if site_info["days_worked"] else 0,
-                    "entries": site_info["entries"]
-                })
-
-            # Sort by total hours descending
-            site_list.sort(key=lambda x: x["total_hours"], reverse=True)
-
-            # Overall stats
-            total_hours = sum(e["hours_worked"] for e in timesheets)
-            total_sites = len(site_data)
-            total_entries = len(timesheets)
-
-            return {
-                "success": True,
-                "view": "by_site",
-                "summary": {
-                    "total_hours": round(total_hours, 2),
-                    "total_sites": total_sites,
-                    "total_entries": total_entries,
-                    "avg_hours_per_site": round(total_hours / total_sites, 2) if total_sites > 0 else 0
-                },
-                "site_summary": site_list,
-                "entries": timesheets
-            }
+        # Per-site totals are aggregated in Postgres (migrations/015) and
+        # fetched alongside the entries
+        site_list, timesheets = await fetch_timesheet_report(
+            get_supabase_client(),
+            filters,
+            summary_rpc=SITE_SUMMARY_RPC,
+            include_entries=include_entries
+        )
+
+        # Streamed entries carry site_id, so per-site copies aren't needed
+        if not ndjson:
+            attach_entries_to_sites(site_list, timesheets)
+
+        # Overall stats
+        total_hours = sum(site["total_hours"] for site in site_list)
+        total_sites = len(site_list)
+        total_entries = sum(site["entry_count"] for site in site_list)
+
+        result = {
+            "success": True,
+            "view": "by_site",
+            "summary": {
+                "total_hours": round(total_hours, 2),
+                "total_sites": total_sites,
+                "total_entries": total_entries,
+                "avg_hours_per_site": round(total_hours / total_sites, 2) if total_sites > 0 else 0
+            },
+            "site_summary": site_list,
+            "entries": timesheets
+        }
+
+        if ndjson:
+            return ndjson_report_response(result)
+
+        return cached_json_response(request, *render_json(result), max_age=0)
 
     except Exception as e:
-        logger.error(f"Error fetching timesheets by site: {e}")
+        logger.error("Error fetching timesheets by site: %s", e)
         return {"success": False, "error": str(e)}
 
 @router.get("/admin/reports/voice-notes", response_class=HTMLResponse)
@@ -1253,5 +1184,6 @@ async def voice_notes_report_page(request: Request):
     """Voice notes report page"""
     return templates.TemplateResponse(
         "reports/voice_notes.html",
-        {"request": request, "page_title": "Voice Notes Reports"}
+        {"request": request, "page_title": "Voice Notes Reports"},
+        headers=REPORT_PAGE_CACHE_CONTROL
     )
@@ -0,0 +1,111 @@
+"""
+Shared Supabase REST Client
+
+A single pooled httpx.AsyncClient is reused by every admin request so
+connections to Supabase stay warm instead of paying a fresh TCP+TLS
+handshake per query. HTTP/2 is enabled so concurrent queries (e.g. the
+report queries fired with asyncio.gather) multiplex over one
+connection. The client carries the service-key headers and the
+Supabase base URL, so callers only pass a relative path such as
+"/rest/v1/tenants". Timeouts and connection retries are configured here
+for every caller.
+"""
+
+import os
+from typing import Optional
+
+import httpx
+import orjson
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+
+# Connection attempts retried by the transport (connect errors/timeouts only,
+# so non-idempotent writes are never sent twice)
+SUPABASE_CONNECT_RETRIES = 2
+
+# Per-request header sets, built once. Auth headers live on the client itself.
+PREFER_COUNT_EXACT = {"Prefer": "count=exact"}
+PREFER_RETURN_MINIMAL = {"Prefer": "return=minimal"}
+PREFER_RETURN_REPRESENTATION = {"Prefer": "return=representation"}
+PREFER_UPSERT_MINIMAL = {"Prefer": "resolution=merge-duplicates,return=minimal"}
+
+# Ask PostgREST for a single JSON object instead of a one-element array.
+# Zero (or several) matching rows come back as 406 instead of 200.
+ACCEPT_SINGLE_OBJECT = {"Accept": "application/vnd.pgrst.object+json"}
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_supabase_client() -> httpx.AsyncClient:
+    """
+    Get the shared Supabase client, creating it on first use
+
+    Returns:
+        Pooled httpx.AsyncClient configured for the Supabase REST API
+    """
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=SUPABASE_URL or "",
+            headers={
+                "apikey": SUPABASE_SERVICE_KEY or "",
+                "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}"
+            },
+            timeout=httpx.Timeout(10.0, connect=2.0),
+            # Retry failed connection attempts here, once for every caller
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                limits=httpx.Limits(max_connections=120, max_keepalive_connections=80),
+                retries=SUPABASE_CONNECT_RETRIES
+            )
+        )
+
+    return _client
+
+
+async def close_supabase_client():
+    """Close the shared Supabase client (called on application shutdown)"""
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def parse_json(response: httpx.Response):
+    """
+    Decode a Supabase JSON response body with orjson
+
+    Faster than httpx's Response.json() (stdlib json) on the array-of-rows
+    payloads PostgREST returns.
+
+    Args:
+        response: Response from the shared client
+
+    Returns:
+        Decoded JSON value
+    """
+    return orjson.loads(response.content)
+
+
+def parse_content_range_total(content_range: Optional[str]) -> int:
+    """
+    Extract the total row count from a PostgREST Content-Range header
+
+    Args:
+        content_range: Header value such as "0-24/3573" or "*/0"
+
+    Returns:
+        Total count, or 0 if the header is missing or has no total
+    """
+    if not content_range or "/" not in content_range:
+        return 0
+
+    total = content_range.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else 0
@@ -0,0 +1,163 @@
+"""
+Timesheet Report Queries
+
+Supabase queries shared by the admin timesheet reports (all users,
+individual user and by site). Entries come from the timesheets table with
+the user and site names embedded; per-user and per-site totals come from
+the aggregate RPCs (migrations/010 and 015). A report's summary and
+entries are fetched concurrently over the shared client.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional, Tuple
+
+import httpx
+
+from app.admin.supabase import parse_json
+
+logger = logging.getLogger(__name__)
+
+TIMESHEET_COLUMNS = "id,work_date,start_time,end_time,hours_worked,work_description,plans_for_tomorrow,site_id,user_id,users(name)"
+# Sites are stored in the entities table; the site name is spread into each
+# entry as site_name via the timesheets.site_id foreign key
+TIMESHEET_WITH_SITE_COLUMNS = TIMESHEET_COLUMNS + ",...entities!site_id(site_name:name)"
+
+USER_SUMMARY_RPC = "timesheet_user_summary"
+SITE_SUMMARY_RPC = "timesheet_site_summary"
+
+
+class TimesheetQueryError(Exception):
+    """A Supabase request for report data failed"""
+
+
+@dataclass(slots=True)
+class TimesheetFilters:
+    """Report filters; None means no filter"""
+    tenant_id: Optional[str] = None
+    user_id: Optional[str] = None
+    site_id: Optional[str] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+    def entry_params(self) -> dict:
+        """PostgREST query params for the matching entries, newest first"""
+        params = {
+            "select": TIMESHEET_WITH_SITE_COLUMNS,
+            "order": "work_date.desc,start_time.desc"
+        }
+
+        if self.tenant_id:
+            params["tenant_id"] = f"eq.{self.tenant_id}"
+        if self.user_id:
+            params["user_id"] = f"eq.{self.user_id}"
+        if self.site_id:
+            params["site_id"] = f"eq.{self.site_id}"
+
+        if self.start_date and self.end_date:
+            params["and"] = f"(work_date.gte.{self.start_date},work_date.lte.{self.end_date})"
+        elif self.start_date:
+            params["work_date"] = f"gte.{self.start_date}"
+        elif self.end_date:
+            params["work_date"] = f"lte.{self.end_date}"
+
+        return params
+
+    def rpc_args(self) -> dict:
+        """Arguments for the summary RPCs (omitted filters use the SQL defaults)"""
+        args = {
+            "p_tenant_id": self.tenant_id,
+            "p_user_id": self.user_id,
+            "p_site_id": self.site_id,
+            "p_start_date": self.start_date.isoformat() if self.start_date else None,
+            "p_end_date": self.end_date.isoformat() if self.end_date else None
+        }
+        return {name: value for name, value in args.items() if value is not None}
+
+
+async def fetch_timesheet_report(
+    client: httpx.AsyncClient,
+    filters: TimesheetFilters,
+    summary_rpc: Optional[str] = None,
+    include_entries: bool = True
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Fetch a report's summary rows and entries concurrently
+
+    Args:
+        client: Shared Supabase client
+        filters: Report filters
+        summary_rpc: Aggregate RPC to call (USER_SUMMARY_RPC or
+            SITE_SUMMARY_RPC), or None for no summary rows
+        include_entries: Whether to fetch the raw entries
+
+    Returns:
+        Tuple of (summary rows, entries); each is empty if not requested
+
+    Raises:
+        TimesheetQueryError: If any Supabase request fails
+    """
+    requests = []
+    if summary_rpc:
+        requests.append(client.post(f"/rest/v1/rpc/{summary_rpc}", json=filters.rpc_args()))
+    if include_entries:
+        requests.append(client.get("/rest/v1/timesheets", params=filters.entry_params()))
+
+    responses = await asyncio.gather(*requests)
+
+    for response in responses:
+        if response.status_code != 200:
+            logger.error("Supabase error: %s - %.500s", response.status_code, response.text)
+            raise TimesheetQueryError(f"Failed to fetch timesheets: {response.text}")
+
+    summary_rows = parse_json(responses[0]) if summary_rpc else []
+    entries = parse_json(responses[-1]) if include_entries else []
+    if include_entries:
+        logger.info("Found %d timesheets", len(entries))
+
+    return summary_rows, entries
+
+
+def summarize_entries(entries: List[dict]) -> dict:
+    """
+    Total hours and distinct days for a list of entries (one pass)
+
+    Args:
+        entries: Timesheet entries
+
+    Returns:
+        Summary dict for the individual-user view
+    """
+    total_hours = 0
+    work_dates = set()
+    for entry in entries:
+        total_hours += entry["hours_worked"]
+        work_dates.add(entry["work_date"])
+    unique_days = len(work_dates)
+
+    return {
+        "total_hours": round(total_hours, 2),
+        "days_worked": unique_days,
+        "total_entries": len(entries),
+        "avg_hours_per_day": round(total_hours / unique_days, 2) if unique_days > 0 else 0
+    }
+
+
+def attach_entries_to_sites(site_rows: List[dict], entries: List[dict]):
+    """
+    Add each site's entries to its summary row (in place, order preserved)
+
+    Args:
+        site_rows: Rows from SITE_SUMMARY_RPC
+        entries: Timesheet entries (newest first)
+    """
+    entries_by_site = {site["site_id"]: [] for site in site_rows}
+    for entry in entries:
+        site_entries = entries_by_site.get(entry["site_id"])
+        if site_entries is not None:
+            site_entries.append(entry)
+
+    for site in site_rows:
+        site["entries"] = entries_by_site[site["site_id"]]
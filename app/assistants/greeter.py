@@ -13,27 +13,8 @@ from app.assistants.base_assistant import BaseAssistant
 logger = logging.getLogger(__name__)
 
 
-class GreeterAssistant(BaseAssistant):
-    """
-    Universal Greeter - Authenticates and routes to skills
-
-    This assistant:
-    - Authenticates the caller by phone
-    - Dynamically greets based on available skills
-    - Routes to appropriate skill/assistant
-    """
-
-    def __init__(self):
-        super().__init__(
-            assistant_key="greeter",
-            name="JSMB-Jill-authenticate-and-greet",
-            description="Authenticates users and dynamically routes to their available skills",
-            required_skills=["authentication"]
-        )
-
-    def get_system_prompt(self) -> str:
-        """System prompt defining the greeter's behavior"""
-        return """You are Jill, a warm and professional assistant for construction companies.
+# System prompt for the greeter
+GREETER_SYSTEM_PROMPT = """You are Jill, a warm and professional assistant for construction companies.
 
 PROCESS FLOW (ALWAYS FOLLOW IN ORDER)
 
@@ -106,29 +87,69 @@ DO & DON'T SUMMARY
 • Announce that you're waiting for something
 • Ask "did you mean X?" when a phonetic variant is clearly one of the options you offered"""
 
+# Voice configuration using ElevenLabs - consistent across all assistants
+GREETER_VOICE_CONFIG = {
+    "model": "eleven_turbo_v2_5",
+    "voiceId": "MiueK1FXuZTCItgbQwPu",
+    "provider": "11labs",
+    "stability": 0.6,  # Slightly higher for more consistent, measured pace
+    "similarityBoost": 0.75,
+    "speed": 0.95  # Slightly slower for better comprehension
+}
+
+# Model configuration (gpt-4o-mini to match POC behavior)
+GREETER_MODEL_CONFIG = {
+    "provider": "openai",
+    "model": "gpt-4o-mini",  # Matches POC - less likely to generate filler phrases with tool calls
+    "temperature": 0.7,
+    "maxTokens": 1200
+}
+
+# Skill routing phrases users commonly say
+# Nova-3 keyterms: no intensifiers, supports multi-word phrases
+GREETER_ROUTING_KEYTERMS = (
+    "log my timesheet",
+    "record a note",
+    "site update",
+    "help",
+    "options"
+)
+
+
+class GreeterAssistant(BaseAssistant):
+    """
+    Universal Greeter - Authenticates and routes to skills
+
+    This assistant:
+    - Authenticates the caller by phone
+    - Dynamically greets based on available skills
+    - Routes to appropriate skill/assistant
+    """
+
+    def __init__(self):
+        super().__init__(
+            assistant_key="greeter",
+            name="JSMB-Jill-authenticate-and-greet",
+            description="Authenticates users and dynamically routes to their available skills",
+            required_skills=["authentication"]
+        )
+
+    def get_system_prompt(self) -> str:
+        """System prompt defining the greeter's behavior"""
+        return GREETER_SYSTEM_PROMPT
+
     def get_first_message(self) -> str:
         """Empty string to trigger model-generated first message after authentication"""
         return ""  # Empty string (not None) - model speaks after authenticate_caller completes
 
     def get_voice_config(self) -> Dict:
         """Voice configuration using ElevenLabs - consistent across all assistants"""
-        return {
-            "model": "eleven_turbo_v2_5",
-            "voiceId": "MiueK1FXuZTCItgbQwPu",
-            "provider": "11labs",
-            "stability": 0.6,  # Slightly higher for more consistent, measured pace
-            "similarityBoost": 0.75,
-            "speed": 0.95  # Slightly slower for better comprehension
-        }
+        return dict(GREETER_VOICE_CONFIG)
 
     def get_model_config(self) -> Dict:
         """Model configuration (gpt-4o-mini to match POC behavior)"""
-        return {
-            "provider": "openai",
-            "model": "gpt-4o-mini",  # Matches POC - less likely to generate filler phrases with tool calls
-            "temperature": 0.7,
-            "maxTokens": 1200
-        }
+        # Copy: create() adds the messages and toolIds to the returned dict
+        return dict(GREETER_MODEL_CONFIG)
 
     def get_transcriber_config(self) -> Dict:
         """
@@ -141,19 +162,8 @@ DO & DON'T SUMMARY
         """
         base_config = super().get_transcriber_config()
 
-        # Add greeter-specific routing keyterms
-        # Nova-3 keyterms: no intensifiers, supports multi-word phrases
-        routing_keyterms = [
-            # Skill routing phrases users commonly say
-            "log my timesheet",
-            "record a note",
-            "site update",
-            "help",
-            "options"
-        ]
-
         # Merge with base keyterms
-        base_config["keyterm"] = base_config.get("keyterm", []) + routing_keyterms
+        base_config["keyterm"] = base_config.get("keyterm", []) + list(GREETER_ROUTING_KEYTERMS)
 
         return base_config
 
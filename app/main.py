@@ -1,11 +1,13 @@
 # app/main.py - Complete FastAPI application with VAPI endpoints
 
 from fastapi import FastAPI, HTTPException, Depends, Header, Request
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+import asyncio
 import httpx
 import os
 from datetime import datetime
@@ -31,6 +33,14 @@ from app.assistants.journey_bank_demo import JourneyBankDemoAssistant
 
 # NEW: Import admin interface
 from app.admin import admin_router
+from app.admin.supabase import (
+    get_supabase_client,
+    close_supabase_client,
+    parse_json,
+    SUPABASE_URL,
+    SUPABASE_SERVICE_KEY,
+    PREFER_RETURN_MINIMAL,
+)
 
 # Load environment variables from .env file
 load_dotenv()
@@ -39,7 +49,31 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Multi-Tenant Document RAG + VAPI Skills System", version="1.0.0")
+def log_event_loop_exception(loop, context):
+    """Log unhandled event-loop errors along with how many tasks are pending"""
+    # The default handler logs the full context (task, future, traceback)
+    loop.default_exception_handler(context)
+    logger.error("Event loop error: %d tasks pending", len(asyncio.all_tasks(loop)))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Report callbacks that block the loop for more than 100ms (logged when
+    # asyncio debug mode is on, e.g. PYTHONASYNCIODEBUG=1)
+    loop = asyncio.get_running_loop()
+    loop.slow_callback_duration = 0.1
+    loop.set_exception_handler(log_event_loop_exception)
+
+    # Shared Supabase client for the admin interface (pooled connections),
+    # opened before the first request and closed on shutdown
+    app.state.supabase = get_supabase_client()
+    yield
+    await close_supabase_client()
+
+app = FastAPI(
+    title="Multi-Tenant Document RAG + VAPI Skills System",
+    version="1.0.0",
+    lifespan=lifespan
+)
 
 # ============================================
 # NEW SKILL-BASED ARCHITECTURE
@@ -379,42 +413,32 @@ async def handle_end_of_call_report(request: Request):
                         logger.warning(f"Unknown role '{role}' with content: {content[:50]}")
 
         # Update tables with full transcript
-        async with httpx.AsyncClient() as client:
-            logger.info(f"Updating site_progress_updates and voice_notes with transcript for call {call_id}")
-
-            # Update any site_progress_updates with the real transcript
-            update_response = await client.patch(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/site_progress_updates",
-                headers={
-                    "apikey": os.getenv("SUPABASE_SERVICE_KEY"),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=minimal"
-                },
-                params={"vapi_call_id": f"eq.{call_id}"},
-                json={"raw_transcript": full_transcript}
-            )
+        client = get_supabase_client()
+        logger.info("Updating site_progress_updates and voice_notes with transcript for call %s", call_id)
+
+        # Update any site_progress_updates with the real transcript
+        update_response = await client.patch(
+            "/rest/v1/site_progress_updates",
+            headers=PREFER_RETURN_MINIMAL,
+            params={"vapi_call_id": f"eq.{call_id}"},
+            json={"raw_transcript": full_transcript}
+        )
 
-            if update_response.status_code in [200, 204]:
-                logger.info(f"✓ Updated site_progress_updates with real transcript for call {call_id} ({len(full_transcript)} chars)")
+        if update_response.status_code in [200, 204]:
+            logger.info("✓ Updated site_progress_updates with real transcript for call %s (%d chars)", call_id, len(full_transcript))
 
-            # Also update voice_notes with real transcript
-            notes_response = await client.patch(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/voice_notes",
-                headers={
-                    "apikey": os.getenv("SUPABASE_SERVICE_KEY"),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=minimal"
-                },
-                params={"vapi_call_id": f"eq.{call_id}"},
-                json={"full_transcript": full_transcript}
-            )
+        # Also update voice_notes with real transcript
+        notes_response = await client.patch(
+            "/rest/v1/voice_notes",
+            headers=PREFER_RETURN_MINIMAL,
+            params={"vapi_call_id": f"eq.{call_id}"},
+            json={"full_transcript": full_transcript}
+        )
 
-            if notes_response.status_code in [200, 204]:
-                logger.info(f"✓ Updated voice_notes with real transcript for call {call_id}")
+        if notes_response.status_code in [200, 204]:
+            logger.info("✓ Updated voice_notes with real transcript for call %s", call_id)
 
-            return {"success": True}
+        return {"success": True}
 
     except Exception as e:
         logger.error(f"Error handling end-of-call report: {e}")
@@ -554,44 +578,37 @@ async def get_tenant_from_api_key(authorization: str = Header(None)) -> str:
     api_key = authorization.replace("Bearer ", "")
     
     # Check environment variables
-    supabase_url = os.getenv('SUPABASE_URL')
-    supabase_service_key = os.getenv('SUPABASE_SERVICE_KEY')
-    
-    if not supabase_url:
+    if not SUPABASE_URL:
         raise HTTPException(status_code=500, detail="SUPABASE_URL environment variable not set")
     
-    if not supabase_service_key:
+    if not SUPABASE_SERVICE_KEY:
         raise HTTPException(status_code=500, detail="SUPABASE_SERVICE_KEY environment variable not set")
     
     try:
-        # Use your existing Supabase client
-        async with httpx.AsyncClient() as client:
-            # Set tenant context using the API key
-            response = await client.post(
-                f"{supabase_url}/rest/v1/rpc/authenticate_tenant_by_api_key",
-                headers={
-                    "apikey": supabase_service_key,
-                    "Authorization": f"Bearer {supabase_service_key}",
-                    "Content-Type": "application/json"
-                },
-                json={"api_key_input": api_key}
-            )
-            
-            if response.status_code != 200:
-                print(f"Supabase error: {response.status_code} - {response.text}")
-                raise HTTPException(status_code=401, detail="Invalid API key")
-            
-            tenant_id = response.json()
-            if not tenant_id:
-                raise HTTPException(status_code=401, detail="Invalid API key")
-            
-            return str(tenant_id)
+        # Shared pooled Supabase client (service-key headers already set)
+        client = get_supabase_client()
+
+        # Set tenant context using the API key
+        response = await client.post(
+            "/rest/v1/rpc/authenticate_tenant_by_api_key",
+            json={"api_key_input": api_key}
+        )
+        
+        if response.status_code != 200:
+            logger.error("Supabase error: %s - %.500s", response.status_code, response.text)
+            raise HTTPException(status_code=401, detail="Invalid API key")
+        
+        tenant_id = parse_json(response)
+        if not tenant_id:
+            raise HTTPException(status_code=401, detail="Invalid API key")
+        
+        return str(tenant_id)
     
     except httpx.RequestError as e:
-        print(f"Request error: {e}")
+        logger.error("Request error: %s", e)
         raise HTTPException(status_code=500, detail="Database connection error")
     except Exception as e:
-        print(f"Authentication error: {e}")
+        logger.error("Authentication error: %s", e)
         raise HTTPException(status_code=500, detail="Authentication system error")
 
 # ============================================
@@ -610,50 +627,45 @@ async def authenticate_vapi_caller(
     
     try:
         # Call the simplified authentication function that accepts tenant_id directly
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/rpc/authenticate_caller_with_tenant",
-                headers={
-                    "apikey": os.getenv('SUPABASE_SERVICE_KEY'),
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_SERVICE_KEY')}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "caller_phone": request.caller_phone,
-                    "tenant_uuid": tenant_id,
-                    "called_phone": request.called_phone
-                }
+        client = get_supabase_client()
+        response = await client.post(
+            "/rest/v1/rpc/authenticate_caller_with_tenant",
+            json={
+                "caller_phone": request.caller_phone,
+                "tenant_uuid": tenant_id,
+                "called_phone": request.called_phone
+            }
+        )
+        
+        if response.status_code != 200:
+            return UnifiedAuthResponse(
+                authorized=False,
+                error=f"Authentication system error: {response.text}",
+                greeting_message="I'm experiencing technical difficulties. Please try again later."
             )
-            
-            if response.status_code != 200:
-                return UnifiedAuthResponse(
-                    authorized=False,
-                    error=f"Authentication system error: {response.text}",
-                    greeting_message="I'm experiencing technical difficulties. Please try again later."
-                )
-            
-            auth_result = response.json()
-            
-            if not auth_result.get("authorized", False):
-                return UnifiedAuthResponse(
-                    authorized=False,
-                    error=auth_result.get("error", "Caller not authorized"),
-                    greeting_message="I'm sorry, but I can't assist with this call. Please contact support if you believe this is an error."
-                )
-            
-            # Route based on session type
-            if auth_result["session_type"] == "internal_user":
-                return await handle_internal_user_auth(auth_result, request.intent)
-            elif auth_result["session_type"] == "external_customer":
-                return await handle_external_customer_auth(auth_result, request.intent)
-            
+        
+        auth_result = parse_json(response)
+        
+        if not auth_result.get("authorized", False):
             return UnifiedAuthResponse(
                 authorized=False,
-                error="Unknown session type"
+                error=auth_result.get("error", "Caller not authorized"),
+                greeting_message="I'm sorry, but I can't assist with this call. Please contact support if you believe this is an error."
             )
-            
+        
+        # Route based on session type
+        if auth_result["session_type"] == "internal_user":
+            return await handle_internal_user_auth(auth_result, request.intent)
+        elif auth_result["session_type"] == "external_customer":
+            return await handle_external_customer_auth(auth_result, request.intent)
+        
+        return UnifiedAuthResponse(
+            authorized=False,
+            error="Unknown session type"
+        )
+        
     except Exception as e:
-        print(f"VAPI authentication error: {e}")
+        logger.error("VAPI authentication error: %s", e)
         return UnifiedAuthResponse(
             authorized=False,
             error=f"System error: {str(e)}",
@@ -2201,4 +2213,4 @@ async def debug_session_context(vapi_call_id: str):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
\ No newline at end of file
@@ -0,0 +1,44 @@
+-- Migration: Create admin login context RPC
+-- Description: Returns an active admin user (matched by username or email),
+-- their tenant and their permissions in one call, so /admin/auth/login needs
+-- a single Supabase round-trip instead of separate user + permissions queries.
+-- last_login_at is still written by the backend only after the password check.
+
+CREATE OR REPLACE FUNCTION get_admin_login_context(p_identifier TEXT)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'id', au.id,
+        'username', au.username,
+        'email', au.email,
+        'password_hash', au.password_hash,
+        'role', au.role,
+        'tenant_id', au.tenant_id,
+        'tenants', CASE
+            WHEN t.id IS NULL THEN NULL
+            ELSE json_build_object('id', t.id, 'name', t.name)
+        END,
+        'permissions', COALESCE(
+            (
+                SELECT json_agg(p.permission_type ORDER BY p.permission_type)
+                FROM admin_user_permissions p
+                WHERE p.admin_user_id = au.id
+            ),
+            '[]'::json
+        )
+    )
+    FROM admin_users au
+    LEFT JOIN tenants t ON t.id = au.tenant_id
+    WHERE au.is_active
+      AND (lower(au.username) = lower(p_identifier) OR lower(au.email) = lower(p_identifier))
+    LIMIT 1;
+$$;
+
+-- The result includes the password hash: only the backend (service role) may call it
+REVOKE ALL ON FUNCTION get_admin_login_context(TEXT) FROM PUBLIC;
+REVOKE ALL ON FUNCTION get_admin_login_context(TEXT) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_admin_login_context(TEXT) TO service_role;
+
+COMMENT ON FUNCTION get_admin_login_context(TEXT) IS 'Admin login lookup: user + tenant + permissions in one call (backend only)';
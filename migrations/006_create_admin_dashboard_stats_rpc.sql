@@ -0,0 +1,42 @@
+-- Migration: Create admin dashboard stats RPC
+-- Description: Returns every admin dashboard count in one call, so
+-- /admin/dashboard/stats needs a single Supabase round-trip. Pass a tenant id
+-- for one tenant's stats, or NULL for the super-admin aggregate across all
+-- tenants. Timesheet entries are counted from the timesheets table (003).
+
+CREATE OR REPLACE FUNCTION admin_dashboard_stats(p_tenant_id UUID DEFAULT NULL)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'tenants', (
+            SELECT count(*) FROM tenants
+            WHERE p_tenant_id IS NULL OR id = p_tenant_id
+        ),
+        'users', (
+            SELECT count(*) FROM users
+            WHERE p_tenant_id IS NULL OR tenant_id = p_tenant_id
+        ),
+        'sites', (
+            SELECT count(*) FROM entities
+            WHERE entity_type = 'sites'
+              AND (p_tenant_id IS NULL OR tenant_id = p_tenant_id)
+        ),
+        'voice_notes', (
+            SELECT count(*) FROM voice_notes
+            WHERE p_tenant_id IS NULL OR tenant_id = p_tenant_id
+        ),
+        'timesheet_entries', (
+            SELECT count(*) FROM timesheets
+            WHERE p_tenant_id IS NULL OR tenant_id = p_tenant_id
+        )
+    );
+$$;
+
+-- Cross-tenant counts: only the backend (service role) may call it
+REVOKE ALL ON FUNCTION admin_dashboard_stats(UUID) FROM PUBLIC;
+REVOKE ALL ON FUNCTION admin_dashboard_stats(UUID) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION admin_dashboard_stats(UUID) TO service_role;
+
+COMMENT ON FUNCTION admin_dashboard_stats(UUID) IS 'Admin dashboard counts for one tenant, or all tenants when NULL (backend only)';
@@ -0,0 +1,8 @@
+-- Migration: Add case-insensitive login indexes on admin_users
+-- Description: get_admin_login_context (005) matches lower(username) or
+-- lower(email). These expression indexes let both lookups use an index scan
+-- instead of scanning admin_users, and make usernames unique regardless of
+-- case.
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_admin_users_username_lower ON admin_users(lower(username));
+CREATE INDEX IF NOT EXISTS idx_admin_users_email_lower ON admin_users(lower(email));
@@ -0,0 +1,25 @@
+-- Migration: Create toggle_user_active RPC
+-- Description: Flips users.is_active in a single UPDATE and returns the new
+-- value, so the admin toggle needs one round-trip instead of read-then-write
+-- (and two concurrent toggles can't both write the same value). Pass a tenant
+-- id to restrict the update to that tenant's users, or NULL (super admin) for
+-- any user. Returns NULL when no matching user exists.
+
+CREATE OR REPLACE FUNCTION toggle_user_active(p_user_id UUID, p_tenant_id UUID DEFAULT NULL)
+RETURNS BOOLEAN
+LANGUAGE sql
+VOLATILE
+AS $$
+    UPDATE users
+    SET is_active = NOT is_active
+    WHERE id = p_user_id
+      AND (p_tenant_id IS NULL OR tenant_id = p_tenant_id)
+    RETURNING is_active;
+$$;
+
+-- Tenant scoping is enforced by the caller: only the backend (service role) may call it
+REVOKE ALL ON FUNCTION toggle_user_active(UUID, UUID) FROM PUBLIC;
+REVOKE ALL ON FUNCTION toggle_user_active(UUID, UUID) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION toggle_user_active(UUID, UUID) TO service_role;
+
+COMMENT ON FUNCTION toggle_user_active(UUID, UUID) IS 'Flip a user''s is_active flag, optionally scoped to a tenant (backend only)';
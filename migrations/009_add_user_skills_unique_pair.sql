@@ -0,0 +1,10 @@
+-- Migration: Make (user_id, skill_id) unique on user_skills
+-- Description: Lets the admin "add skill" action upsert with
+-- POST ...?on_conflict=user_id,skill_id instead of check-then-insert/update,
+-- and gives user_skills.id a database default so callers no longer generate
+-- UUIDs. Assumes no duplicate (user_id, skill_id) rows exist; the admin UI and
+-- scripts already check for an existing row before inserting.
+
+ALTER TABLE user_skills ALTER COLUMN id SET DEFAULT gen_random_uuid();
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_skills_user_skill ON user_skills(user_id, skill_id);
@@ -0,0 +1,49 @@
+-- Migration: Create timesheet_user_summary RPC
+-- Description: Per-user timesheet totals for the admin timesheets report,
+-- aggregated in Postgres instead of summing every entry in the backend.
+-- All filters are optional (NULL = no filter) and match the report's
+-- tenant / user / site / date-range filters. Rows are ordered by total hours,
+-- highest first.
+
+CREATE OR REPLACE FUNCTION timesheet_user_summary(
+    p_tenant_id UUID DEFAULT NULL,
+    p_user_id UUID DEFAULT NULL,
+    p_site_id UUID DEFAULT NULL,
+    p_start_date DATE DEFAULT NULL,
+    p_end_date DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    user_id UUID,
+    user_name TEXT,
+    total_hours NUMERIC,
+    entry_count BIGINT,
+    days_worked BIGINT,
+    avg_hours_per_day NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        t.user_id,
+        COALESCE(u.name, 'Unknown User') AS user_name,
+        round(sum(t.hours_worked), 2) AS total_hours,
+        count(*) AS entry_count,
+        count(DISTINCT t.work_date) AS days_worked,
+        round(sum(t.hours_worked) / count(DISTINCT t.work_date), 2) AS avg_hours_per_day
+    FROM timesheets t
+    LEFT JOIN users u ON u.id = t.user_id
+    WHERE (p_tenant_id IS NULL OR t.tenant_id = p_tenant_id)
+      AND (p_user_id IS NULL OR t.user_id = p_user_id)
+      AND (p_site_id IS NULL OR t.site_id = p_site_id)
+      AND (p_start_date IS NULL OR t.work_date >= p_start_date)
+      AND (p_end_date IS NULL OR t.work_date <= p_end_date)
+    GROUP BY t.user_id, u.name
+    ORDER BY total_hours DESC;
+$$;
+
+-- Cross-tenant when p_tenant_id is NULL: only the backend (service role) may call it
+REVOKE ALL ON FUNCTION timesheet_user_summary(UUID, UUID, UUID, DATE, DATE) FROM PUBLIC;
+REVOKE ALL ON FUNCTION timesheet_user_summary(UUID, UUID, UUID, DATE, DATE) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION timesheet_user_summary(UUID, UUID, UUID, DATE, DATE) TO service_role;
+
+COMMENT ON FUNCTION timesheet_user_summary(UUID, UUID, UUID, DATE, DATE) IS 'Per-user timesheet totals for the admin report (backend only)';
@@ -0,0 +1,27 @@
+-- Migration: Create available_skills_for_user RPC
+-- Description: Returns the skills a user does not currently have enabled
+-- (anti-join against user_skills), so the admin "add skill" picker needs one
+-- small query instead of downloading the whole catalog plus the user's skills
+-- and diffing them in the backend. Served by idx_user_skills_user_skill (009).
+
+CREATE OR REPLACE FUNCTION available_skills_for_user(p_user_id UUID)
+RETURNS SETOF skills
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT s.*
+    FROM skills s
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM user_skills us
+        WHERE us.skill_id = s.id
+          AND us.user_id = p_user_id
+          AND us.is_enabled
+    );
+$$;
+
+REVOKE ALL ON FUNCTION available_skills_for_user(UUID) FROM PUBLIC;
+REVOKE ALL ON FUNCTION available_skills_for_user(UUID) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION available_skills_for_user(UUID) TO service_role;
+
+COMMENT ON FUNCTION available_skills_for_user(UUID) IS 'Skills a user does not have enabled, for the admin skill picker (backend only)';
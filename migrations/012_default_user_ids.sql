@@ -0,0 +1,6 @@
+-- Migration: Let Postgres generate users.id
+-- Description: The admin "create user" action no longer sends a client-side
+-- UUID; the id is assigned by the database and returned via
+-- Prefer: return=representation. (user_skills.id got the same default in 009.)
+
+ALTER TABLE users ALTER COLUMN id SET DEFAULT gen_random_uuid();
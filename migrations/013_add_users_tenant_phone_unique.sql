@@ -0,0 +1,7 @@
+-- Migration: Make phone numbers unique per tenant
+-- Description: Lets the admin "create user" action rely on the database to
+-- reject duplicates (PostgREST answers 409 / SQLSTATE 23505) instead of
+-- checking with a separate query first. Assumes no tenant already has two
+-- users with the same phone number; the admin UI has always checked for that.
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_tenant_phone ON users(tenant_id, phone_number);
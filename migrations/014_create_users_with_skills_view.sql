@@ -0,0 +1,41 @@
+-- Migration: Create users_with_skills view
+-- Description: Users shaped exactly as the admin users page renders them:
+-- the user's columns plus tenant_name and a JSON array of their enabled
+-- skills ({id, key, name}). The admin backend reads this view and passes the
+-- rows straight through instead of reshaping every user in Python.
+-- security_invoker keeps the underlying tables' RLS in force for non-service
+-- callers.
+
+CREATE OR REPLACE VIEW users_with_skills
+WITH (security_invoker = true)
+AS
+SELECT
+    u.id,
+    u.tenant_id,
+    u.name,
+    u.phone_number,
+    u.email,
+    u.role,
+    u.is_active,
+    u.created_at,
+    COALESCE(t.name, 'Unknown') AS tenant_name,
+    COALESCE(
+        (
+            SELECT jsonb_agg(
+                jsonb_build_object('id', s.id, 'key', s.skill_key, 'name', s.name)
+                ORDER BY s.name
+            )
+            FROM user_skills us
+            JOIN skills s ON s.id = us.skill_id
+            WHERE us.user_id = u.id
+              AND us.is_enabled
+        ),
+        '[]'::jsonb
+    ) AS skills
+FROM users u
+LEFT JOIN tenants t ON t.id = u.tenant_id;
+
+REVOKE ALL ON users_with_skills FROM anon, authenticated;
+GRANT SELECT ON users_with_skills TO service_role;
+
+COMMENT ON VIEW users_with_skills IS 'Users with tenant name and enabled skills, for the admin users page';
@@ -0,0 +1,49 @@
+-- Migration: Create timesheet_site_summary RPC
+-- Description: Per-site timesheet totals for the admin timesheets report
+-- (by-site view), aggregated in Postgres instead of summing every entry in
+-- the backend. All filters are optional (NULL = no filter) and match the
+-- report's tenant / site / date-range filters. Rows are ordered by total
+-- hours, highest first.
+
+CREATE OR REPLACE FUNCTION timesheet_site_summary(
+    p_tenant_id UUID DEFAULT NULL,
+    p_site_id UUID DEFAULT NULL,
+    p_start_date DATE DEFAULT NULL,
+    p_end_date DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    site_id UUID,
+    site_name TEXT,
+    total_hours NUMERIC,
+    entry_count BIGINT,
+    user_count BIGINT,
+    days_worked BIGINT,
+    avg_hours_per_day NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        t.site_id,
+        COALESCE(e.name, 'Unknown Site') AS site_name,
+        round(sum(t.hours_worked), 2) AS total_hours,
+        count(*) AS entry_count,
+        count(DISTINCT t.user_id) AS user_count,
+        count(DISTINCT t.work_date) AS days_worked,
+        round(sum(t.hours_worked) / count(DISTINCT t.work_date), 2) AS avg_hours_per_day
+    FROM timesheets t
+    LEFT JOIN entities e ON e.id = t.site_id
+    WHERE (p_tenant_id IS NULL OR t.tenant_id = p_tenant_id)
+      AND (p_site_id IS NULL OR t.site_id = p_site_id)
+      AND (p_start_date IS NULL OR t.work_date >= p_start_date)
+      AND (p_end_date IS NULL OR t.work_date <= p_end_date)
+    GROUP BY t.site_id, e.name
+    ORDER BY total_hours DESC;
+$$;
+
+-- Cross-tenant when p_tenant_id is NULL: only the backend (service role) may call it
+REVOKE ALL ON FUNCTION timesheet_site_summary(UUID, UUID, DATE, DATE) FROM PUBLIC;
+REVOKE ALL ON FUNCTION timesheet_site_summary(UUID, UUID, DATE, DATE) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION timesheet_site_summary(UUID, UUID, DATE, DATE) TO service_role;
+
+COMMENT ON FUNCTION timesheet_site_summary(UUID, UUID, DATE, DATE) IS 'Per-site timesheet totals for the admin report (backend only)';
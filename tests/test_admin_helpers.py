@@ -0,0 +1,261 @@
+"""
+Unit tests for admin interface helpers
+Tests pure helper functions used by the admin routes
+"""
+
+import pytest
+import asyncio
+from datetime import date
+import httpx
+from starlette.requests import Request
+from app.admin.supabase import parse_content_range_total, parse_json
+from app.admin.http_cache import render_json, etag_matches, cached_json_response
+from app.admin.cache import StaleWhileRevalidateCache
+from app.admin.routes import parse_tenant_id, is_uuid_list
+from app.admin.timesheets import TimesheetFilters, summarize_entries, attach_entries_to_sites
+
+
+class TestParseContentRangeTotal:
+    """Test PostgREST Content-Range parsing used for exact counts"""
+
+    def test_range_with_total(self):
+        """Should return the total after the slash"""
+        assert parse_content_range_total("0-24/3573") == 3573
+
+    def test_empty_result(self):
+        """Empty results report '*/0'"""
+        assert parse_content_range_total("*/0") == 0
+
+    def test_unknown_total(self):
+        """Count not requested reports '*' as the total"""
+        assert parse_content_range_total("0-24/*") == 0
+
+    def test_missing_header(self):
+        """Missing header should count as zero"""
+        assert parse_content_range_total(None) == 0
+        assert parse_content_range_total("") == 0
+
+
+class TestJsonEtags:
+    """Test ETag generation and If-None-Match matching"""
+
+    def test_etag_is_stable_and_weak(self):
+        """Same payload should render to the same weak ETag"""
+        body, etag = render_json({"success": True, "tenants": []})
+        assert body == b'{"success":true,"tenants":[]}'
+        assert etag.startswith('W/"')
+        assert render_json({"success": True, "tenants": []})[1] == etag
+
+    def test_etag_changes_with_payload(self):
+        """Different payloads should get different ETags"""
+        assert render_json({"a": 1})[1] != render_json({"a": 2})[1]
+
+    def test_matches_exact_and_strong_form(self):
+        """Weak comparison ignores the W/ prefix"""
+        _, etag = render_json({"a": 1})
+        assert etag_matches(etag, etag)
+        assert etag_matches(etag[2:], etag)
+
+    def test_matches_within_list(self):
+        """If-None-Match may list several ETags"""
+        _, etag = render_json({"a": 1})
+        assert etag_matches(f'W/"other", {etag}', etag)
+
+    def test_wildcard_and_missing(self):
+        """'*' matches anything; a missing header never matches"""
+        _, etag = render_json({"a": 1})
+        assert etag_matches("*", etag)
+        assert not etag_matches(None, etag)
+        assert not etag_matches('W/"other"', etag)
+
+    def test_response_varies_on_session_cookie(self):
+        """Responses (200 and 304) must not be reused across logins"""
+        body, etag = render_json({"a": 1})
+        fresh = cached_json_response(Request({"type": "http", "headers": []}), body, etag, max_age=0)
+        assert fresh.status_code == 200
+        assert fresh.headers["vary"] == "Cookie"
+        assert fresh.headers["cache-control"] == "private, max-age=0"
+
+        request = Request({"type": "http", "headers": [(b"if-none-match", etag.encode())]})
+        not_modified = cached_json_response(request, body, etag, max_age=0)
+        assert not_modified.status_code == 304
+        assert not_modified.headers["vary"] == "Cookie"
+
+
+class TestParseJson:
+    """Test orjson decoding of Supabase responses"""
+
+    def test_matches_httpx_json(self):
+        """Should decode the same value as Response.json()"""
+        response = httpx.Response(200, content=b'[{"id": "u1", "hours_worked": 7.5, "name": "Caf\xc3\xa9"}]')
+        assert parse_json(response) == response.json()
+
+    def test_scalar_body(self):
+        """RPCs returning a scalar decode to that scalar"""
+        assert parse_json(httpx.Response(200, content=b"true")) is True
+
+
+class TestStaleWhileRevalidateCache:
+    """Test the in-process stale-while-revalidate cache"""
+
+    def make_loader(self):
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            return len(calls)
+
+        return loader, calls
+
+    def test_miss_loads_and_hit_is_cached(self):
+        """First get loads, later gets within the fresh window don't"""
+        async def run():
+            cache = StaleWhileRevalidateCache(maxsize=8, fresh_ttl=60, stale_ttl=120)
+            loader, calls = self.make_loader()
+            assert await cache.get("t1", loader) == 1
+            assert await cache.get("t1", loader) == 1
+            return calls
+
+        assert len(asyncio.run(run())) == 1
+
+    def test_stale_value_served_while_refreshing(self):
+        """A stale hit returns the old value and refreshes in the background"""
+        async def run():
+            cache = StaleWhileRevalidateCache(maxsize=8, fresh_ttl=0, stale_ttl=120)
+            loader, calls = self.make_loader()
+            assert await cache.get("t1", loader) == 1
+            assert await cache.get("t1", loader) == 1  # stale, refresh scheduled
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return await cache.get("t1", loader)
+
+        assert asyncio.run(run()) == 2
+
+    def test_invalidate_forces_reload(self):
+        """Invalidated keys are loaded again on the next get"""
+        async def run():
+            cache = StaleWhileRevalidateCache(maxsize=8, fresh_ttl=60, stale_ttl=120)
+            loader, calls = self.make_loader()
+            await cache.get("t1", loader)
+            cache.invalidate("t1")
+            return await cache.get("t1", loader)
+
+        assert asyncio.run(run()) == 2
+
+    def test_failed_refresh_drops_entry_when_not_keeping_stale(self):
+        """With keep_stale_on_error=False a failed refresh evicts the stale value"""
+        async def run():
+            cache = StaleWhileRevalidateCache(
+                maxsize=8, fresh_ttl=0, stale_ttl=120, keep_stale_on_error=False
+            )
+            loader, calls = self.make_loader()
+            await cache.get("t1", loader)
+
+            async def failing_loader():
+                raise ValueError("revoked")
+
+            assert await cache.get("t1", failing_loader) == 1  # stale, refresh scheduled
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            with pytest.raises(ValueError):
+                await cache.get("t1", failing_loader)
+
+        asyncio.run(run())
+
+
+class TestParseTenantId:
+    """Test X-Tenant-ID validation before tenant lookups"""
+
+    def test_valid_uuid_is_normalized(self):
+        """Should accept a UUID and return it in canonical lowercase form"""
+        value = "2F1B8C3E-0D4A-4E5B-9C6D-7E8F9A0B1C2D"
+        assert parse_tenant_id(value) == value.lower()
+
+    def test_missing_or_malformed_is_none(self):
+        """Should reject missing and non-UUID values without raising"""
+        assert parse_tenant_id(None) is None
+        assert parse_tenant_id("") is None
+        assert parse_tenant_id("1 or 1=1") is None
+
+
+class TestIsUuidList:
+    """Test validation of id lists that end up in PostgREST in.(...) filters"""
+
+    def test_list_of_uuids(self):
+        """Should accept a list of UUID strings, including an empty list"""
+        assert is_uuid_list(["2f1b8c3e-0d4a-4e5b-9c6d-7e8f9a0b1c2d"])
+        assert is_uuid_list([])
+
+    def test_rejects_filter_syntax_and_non_strings(self):
+        """Should reject values that could change the filter, and non-lists"""
+        assert not is_uuid_list(["2f1b8c3e-0d4a-4e5b-9c6d-7e8f9a0b1c2d),id.neq.(x"])
+        assert not is_uuid_list(["2f1b8c3e-0d4a-4e5b-9c6d-7e8f9a0b1c2d\n"])
+        assert not is_uuid_list([123])
+        assert not is_uuid_list("2f1b8c3e-0d4a-4e5b-9c6d-7e8f9a0b1c2d")
+        assert not is_uuid_list(None)
+
+
+class TestTimesheetFilters:
+    """Test the shared timesheet report query builders"""
+
+    def test_date_range_uses_and_filter(self):
+        """Should combine start and end dates into one and=(...) filter"""
+        filters = TimesheetFilters(
+            tenant_id="t1",
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 31)
+        )
+        params = filters.entry_params()
+
+        assert params["tenant_id"] == "eq.t1"
+        assert params["and"] == "(work_date.gte.2025-01-01,work_date.lte.2025-01-31)"
+        assert "work_date" not in params
+        assert "user_id" not in params
+
+    def test_rpc_args_omit_unset_filters(self):
+        """Should only send filters that are set, leaving SQL defaults for the rest"""
+        filters = TimesheetFilters(tenant_id="t1", end_date=date(2025, 1, 31))
+
+        assert filters.rpc_args() == {"p_tenant_id": "t1", "p_end_date": "2025-01-31"}
+
+
+class TestTimesheetSummaries:
+    """Test the in-memory parts of the timesheet reports"""
+
+    def test_summarize_entries(self):
+        """Should total hours and count distinct days"""
+        entries = [
+            {"hours_worked": 8, "work_date": "2025-01-01"},
+            {"hours_worked": 2.5, "work_date": "2025-01-01"},
+            {"hours_worked": 7.5, "work_date": "2025-01-02"}
+        ]
+
+        assert summarize_entries(entries) == {
+            "total_hours": 18.0,
+            "days_worked": 2,
+            "total_entries": 3,
+            "avg_hours_per_day": 9.0
+        }
+
+    def test_summarize_no_entries(self):
+        """Should not divide by zero without entries"""
+        assert summarize_entries([])["avg_hours_per_day"] == 0
+
+    def test_attach_entries_to_sites(self):
+        """Should group entries under their site rows, keeping order"""
+        sites = [{"site_id": "s2"}, {"site_id": "s1"}]
+        entries = [
+            {"id": 1, "site_id": "s1"},
+            {"id": 2, "site_id": "s2"},
+            {"id": 3, "site_id": "s1"}
+        ]
+
+        attach_entries_to_sites(sites, entries)
+
+        assert [e["id"] for e in sites[0]["entries"]] == [2]
+        assert [e["id"] for e in sites[1]["entries"]] == [1, 3]
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])